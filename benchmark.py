@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""Benchmarks del notificador de Séneca sobre páginas sintéticas locales"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from seneca_notifier import SenecaNotifier, TelegramSender, setup_logging
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+SESSION_COOKIE = 'JSESSIONID'
+
+# Recursos estáticos de las páginas (tipo y tamaño aproximado de los del portal real)
+RESOURCES = {
+    'estilo.css': ('text/css', "@font-face { font-family: 'Portal'; src: url(fuente.woff2); }\n"
+                               "body { font-family: 'Portal'; }\n" + '/* relleno */\n' * 3000),
+    'logo.png': ('image/png', 'P' * 150 * 1024),
+    'fuente.woff2': ('font/woff2', 'F' * 80 * 1024),
+}
+
+
+def build_messages_page(rows, start=0, next_href=None):
+    """Genera una página de mensajes con la misma estructura que la de PASEN"""
+    lines = [
+        '<html><head><title>Mensajes pendientes</title>',
+        '<link rel="stylesheet" href="/seneca/recursos/estilo.css"></head><body>',
+        '<table><tr><td><img src="/seneca/recursos/logo.png" alt=""></td><td>Menú</td></tr></table>',
+        '<table>',
+        '<tr><th></th><th>Fecha</th><th></th><th></th><th></th><th>Asunto</th><th>Remitido por</th><th>Leído</th></tr>',
+    ]
+    for i in range(start, start + rows):
+        day = i % 28 + 1
+        read_date = '' if i % 3 else f'{day:02d}/04/2024'
+        lines.append(
+            f'<tr><td><input type="checkbox"></td><td>{day:02d}/03/2024</td><td></td><td></td><td></td>'
+            f'<td><a href="mensaje?id={i}">Asunto del mensaje {i}</a></td><td>Profesor {i % 40}</td>'
+            f'<td>{read_date}</td></tr>'
+        )
+    lines.append('</table>')
+    if next_href:
+        lines.append(f'<a href="{next_href}">Siguiente</a>')
+    lines.append('</body></html>')
+    return '\n'.join(lines)
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class FakeSenecaHandler(BaseHTTPRequestHandler):
+    """Séneca local: login, página de inicio, buzón sintético paginado y detalle de mensajes"""
+
+    # Se configuran con start_server()
+    rows = 2000
+    page_size = 0
+    username = 'usuario'
+    password = 'clave'
+    requests = 0
+    # Bytes servidos de páginas HTML y de recursos (estilos, imágenes, fuentes)
+    document_bytes = 0
+    resource_bytes = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_page(self, body, status=200, content_type='text/html; charset=utf-8'):
+        data = body.encode('utf-8')
+        if content_type.startswith('text/html'):
+            type(self).document_bytes += len(data)
+        else:
+            type(self).resource_bytes += len(data)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def logged_in(self):
+        return f'{SESSION_COOKIE}=valida' in self.headers.get('Cookie', '')
+
+    def do_GET(self):
+        type(self).requests += 1
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        base = f'http://{self.headers["Host"]}'
+
+        if url.path == '/seneca/':
+            return self.send_page(read_fixture('login.html').replace('{token}', 'abc123'))
+        if url.path.startswith('/seneca/recursos/') and url.path.rsplit('/', 1)[1] in RESOURCES:
+            content_type, body = RESOURCES[url.path.rsplit('/', 1)[1]]
+            return self.send_page(body, content_type=content_type)
+        if not self.logged_in():
+            # Como el portal real: sin sesión se vuelve a la página de acceso
+            return self.send_page(read_fixture('login.html').replace('{token}', 'abc123'))
+        if url.path == '/seneca/nav/inicio':
+            return self.send_page(read_fixture('inicio.html').replace('{base}', base))
+        if url.path == '/seneca/nav/mensajes':
+            return self.send_page(self.messages_page(int(query.get('p', ['0'])[0])))
+        if url.path == '/seneca/nav/mensaje':
+            message_id = query.get('id', ['0'])[0]
+            return self.send_page(
+                f'<html><body><div>Texto completo del mensaje {message_id}.</div>'
+                f'<a href="adjunto?id={message_id}">circular_{message_id}.pdf</a></body></html>')
+        self.send_page('<html><body>No encontrado</body></html>', 404)
+
+    def do_POST(self):
+        type(self).requests += 1
+        length = int(self.headers.get('Content-Length', 0))
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode('utf-8'))
+        if form.get('USUARIO') == [self.username] and form.get('CLAVE_P') == [self.password]:
+            self.send_response(302)
+            self.send_header('Location', '/seneca/nav/inicio')
+            self.send_header('Set-Cookie', f'{SESSION_COOKIE}=valida; Path=/')
+            self.end_headers()
+        else:
+            self.send_page(read_fixture('login.html').replace('{token}', 'abc123'))
+
+    def messages_page(self, page):
+        if not self.page_size:
+            return build_messages_page(self.rows)
+        start = page * self.page_size
+        rows = max(0, min(self.page_size, self.rows - start))
+        next_href = f'mensajes?p={page + 1}' if start + rows < self.rows else None
+        return build_messages_page(rows, start, next_href)
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """API de Telegram local: acepta sendMessage (guarda los mensajes) y sirve getUpdates"""
+
+    messages = 0
+    # Se configuran con start_server(): mensajes enviados (chat, texto), actualizaciones por entregar
+    # y respuestas a sendMessage por orden, como (estado, JSON); cuando se acaban se acepta todo
+    sent = None
+    updates = None
+    replies = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, body, status=200):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if not url.path.endswith('/getUpdates'):
+            return self.send_json({'ok': False, 'description': 'Not Found'}, 404)
+        offset = int(urllib.parse.parse_qs(url.query).get('offset', ['0'])[0])
+        updates = [update for update in self.updates or [] if update['update_id'] >= offset]
+        if not updates:
+            # Long polling abreviado: no devolver al instante para no girar en vacío
+            time.sleep(0.2)
+        self.send_json({'ok': True, 'result': updates})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode('utf-8'))
+        if self.path.endswith('/sendMessage'):
+            type(self).messages += 1
+            if self.replies:
+                status, body = self.replies.pop(0)
+                return self.send_json(body, status)
+            if self.sent is not None:
+                self.sent.append((form['chat_id'][0], form['text'][0]))
+            self.send_json({'ok': True, 'result': {}})
+        else:
+            self.send_json({'ok': False, 'description': 'Not Found'}, 404)
+
+
+def start_server(handler_class, **attributes):
+    """Arranca un servidor en un puerto libre en segundo plano. Devuelve (servidor, URL base)"""
+    handler = type(handler_class.__name__, (handler_class,), attributes)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def make_notifier(workdir, **config):
+    """Crea un notificador con una configuración mínima en un directorio temporal"""
+    config_file = os.path.join(workdir, 'config.json')
+    base = {
+        'seneca': {'url': 'http://127.0.0.1/seneca/', 'username': 'usuario', 'password': 'clave'},
+        'telegram': {'bot_token': 'TOKEN', 'chat_id': '1'},
+        'data_file': os.path.join(workdir, 'noticias_procesadas.json'),
+        'session_file': os.path.join(workdir, 'sesion_seneca.json'),
+        'session_ttl': 0,
+    }
+    base.update(config)
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(base, f)
+    return SenecaNotifier(config_file)
+
+
+def count_webdriver_calls():
+    """Cuenta las llamadas al protocolo WebDriver. Devuelve una función que lee el contador"""
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+    calls = {'count': 0}
+    execute = WebDriver.execute
+
+    def counting_execute(self, *args, **kwargs):
+        calls['count'] += 1
+        return execute(self, *args, **kwargs)
+
+    WebDriver.execute = counting_execute
+    return lambda: calls['count']
+
+
+def peak_rss_mb():
+    """Memoria residente máxima de este proceso y de sus hijos ya terminados (Chrome incluido)"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, children
+
+
+def time_calls(function, repeat):
+    """Devuelve el mejor tiempo de varias ejecuciones y el último resultado"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark_extraction(args):
+    """Compara la extracción celda a celda con la extracción en bloque"""
+    with tempfile.TemporaryDirectory() as workdir:
+        page = os.path.join(workdir, 'mensajes.html')
+        with open(page, 'w', encoding='utf-8') as f:
+            f.write(build_messages_page(args.rows))
+
+        notifier = make_notifier(workdir)
+        driver = notifier.init_driver()
+        try:
+            driver.get(f'file://{page}')
+            cells_time, (_, cell_rows, _) = time_calls(lambda: notifier.read_news_table(driver), args.repeat)
+            bulk_time, (_, bulk_rows, _) = time_calls(lambda: notifier.read_news_table_bulk(driver), args.repeat)
+        finally:
+            driver.quit()
+
+    print(f"Tabla de {args.rows} filas (mejor de {args.repeat}):")
+    print(f"  celda a celda: {cells_time:.3f}s")
+    print(f"  en bloque:     {bulk_time:.3f}s")
+    print(f"  mismas filas:  {'sí' if cell_rows == bulk_rows else 'NO'}")
+
+
+def benchmark_run(args):
+    """Ejecuta el proceso completo contra Séneca y Telegram locales y muestra sus métricas"""
+    seneca, seneca_url = start_server(FakeSenecaHandler, rows=args.rows, page_size=args.page_size)
+    telegram, telegram_url = start_server(FakeTelegramHandler)
+    webdriver_calls = count_webdriver_calls() if args.engine != 'http' else (lambda: 0)
+    setup_logging(args.log_level)
+    if not args.real_rate_limits:
+        # El Telegram local no limita: medir el resto del proceso sin las esperas entre envíos
+        TelegramSender.GLOBAL_INTERVAL = TelegramSender.CHAT_INTERVAL = TelegramSender.GROUP_INTERVAL = 0
+
+    config = {
+        'seneca': {'url': f'{seneca_url}/seneca/', 'username': 'usuario', 'password': 'clave'},
+        'telegram': {'bot_token': 'TOKEN', 'chat_id': '1', 'api_url': telegram_url,
+                     'digest_threshold': args.digest_threshold},
+        'engine': args.engine,
+        'session_ttl': 1800,
+        'max_pages': args.max_pages,
+    }
+    if args.config_overrides:
+        config.update(json.loads(args.config_overrides))
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for run in range(1, args.runs + 1):
+                notifier = make_notifier(workdir, **config)
+                calls_before = webdriver_calls()
+                requests_before = seneca.RequestHandlerClass.requests
+                document_bytes_before = seneca.RequestHandlerClass.document_bytes
+                resource_bytes_before = seneca.RequestHandlerClass.resource_bytes
+                messages_before = telegram.RequestHandlerClass.messages
+
+                start = time.perf_counter()
+                notifier.run()
+                elapsed = time.perf_counter() - start
+                notifier.close()
+
+                own_rss, children_rss = peak_rss_mb()
+                print(f"\n=== Ejecución {run}/{args.runs} ({args.engine}, {args.rows} filas) ===")
+                print(f"  tiempo total:       {elapsed:.3f}s")
+                for step, seconds in notifier.timings.items():
+                    print(f"  {step + ':':<20}{seconds:.3f}s")
+                print(f"  noticias:           {', '.join(f'{k} {v}' for k, v in notifier.counters.items())}")
+                print(f"  llamadas WebDriver: {webdriver_calls() - calls_before}")
+                print(f"  peticiones Séneca:  {seneca.RequestHandlerClass.requests - requests_before}")
+                print(f"  bytes Séneca:       "
+                      f"{(seneca.RequestHandlerClass.document_bytes - document_bytes_before) / 1024:.0f} KB páginas, "
+                      f"{(seneca.RequestHandlerClass.resource_bytes - resource_bytes_before) / 1024:.0f} KB recursos")
+                print(f"  mensajes Telegram:  {telegram.RequestHandlerClass.messages - messages_before}")
+                print(f"  RSS máximo:         {own_rss:.0f} MB (Python), {children_rss:.0f} MB (procesos hijos)")
+    finally:
+        seneca.shutdown()
+        telegram.shutdown()
+
+
+def import_times(command):
+    """Ejecuta Python con -X importtime. Devuelve {módulo: µs acumulados} y el tiempo de reloj"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + command,
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    elapsed = time.perf_counter() - start
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times, elapsed
+
+
+def benchmark_startup(args):
+    """Mide el coste de importar el notificador y de una ejecución sin trabajo (--flush-outbox)"""
+    heavy = ('selenium', 'webdriver_manager', 'requests')
+    import_best = flush_best = None
+    with tempfile.TemporaryDirectory() as workdir:
+        config_file = os.path.join(workdir, 'config.json')
+        with open(config_file, 'w', encoding='utf-8') as f:
+            json.dump({'seneca': {'url': 'http://127.0.0.1/seneca/', 'username': 'u', 'password': 'p'},
+                       'telegram': {'bot_token': 'TOKEN', 'chat_id': '1'},
+                       'data_file': os.path.join(workdir, 'noticias_procesadas.json'),
+                       'log_level': 'WARNING'}, f)
+
+        for _ in range(args.repeat):
+            times, _ = import_times(['-c', 'import seneca_notifier'])
+            import_us = times.get('seneca_notifier', 0)
+            import_best = import_us if import_best is None else min(import_best, import_us)
+            times, elapsed = import_times(['seneca_notifier.py', '-c', config_file, '--flush-outbox'])
+            flush_best = elapsed if flush_best is None else min(flush_best, elapsed)
+            loaded = sorted(module for module in times if module.split('.')[0] in heavy and '.' not in module)
+
+    print(f"Arranque (mejor de {args.repeat}):")
+    print(f"  import seneca_notifier:  {import_best / 1000:.1f} ms")
+    print(f"  --flush-outbox sin nada: {flush_best * 1000:.0f} ms (proceso completo)")
+    print(f"  módulos pesados cargados: {', '.join(loaded) or 'ninguno'}")
+    if args.budget_ms and import_best / 1000 > args.budget_ms:
+        print(f"  SUPERA el presupuesto de {args.budget_ms} ms")
+        sys.exit(1)
+
+
+def serve(args):
+    """Deja en marcha Séneca y Telegram locales para pruebas manuales"""
+    seneca, seneca_url = start_server(FakeSenecaHandler, rows=args.rows, page_size=args.page_size)
+    telegram, telegram_url = start_server(FakeTelegramHandler)
+    print(f"Séneca local:   {seneca_url}/seneca/ (usuario/clave)")
+    print(f"Telegram local: {telegram_url} (usar como telegram.api_url)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        seneca.shutdown()
+        telegram.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmarks for the Séneca notifier')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    extraction = subparsers.add_parser('extraction', help='Compare per-cell and bulk table extraction')
+    extraction.add_argument('--rows', type=int, default=500, help='Rows in the synthetic table (default: 500)')
+    extraction.add_argument('--repeat', type=int, default=3, help='Repetitions per mode (default: 3)')
+    extraction.set_defaults(func=benchmark_extraction)
+
+    run = subparsers.add_parser('run', help='End-to-end run against local Séneca and Telegram stand-ins')
+    run.add_argument('-e', '--engine', choices=['selenium', 'http', 'auto'], default='http',
+                     help='Scraping engine (default: http)')
+    run.add_argument('--rows', type=int, default=2000, help='Messages in the synthetic mailbox (default: 2000)')
+    run.add_argument('--page-size', type=int, default=0, help='Rows per page, 0 for a single page (default: 0)')
+    run.add_argument('--max-pages', type=int, default=1, help='Pages to follow (default: 1)')
+    run.add_argument('--runs', type=int, default=2,
+                     help='Consecutive runs; the first one finds everything new (default: 2)')
+    run.add_argument('--digest-threshold', type=int, default=10,
+                     help='Send digests above this many new messages (default: 10)')
+    run.add_argument('--real-rate-limits', action='store_true',
+                     help="Keep Telegram's send rate limits against the local stand-in")
+    run.add_argument('--log-level', default='WARNING', type=str.upper,
+                     help="Notifier logging level during the runs (default: WARNING)")
+    run.add_argument('--config-overrides', help='JSON object merged into the generated config')
+    run.set_defaults(func=benchmark_run)
+
+    startup = subparsers.add_parser('startup', help='Import time and no-op run cost (python -X importtime)')
+    startup.add_argument('--repeat', type=int, default=5, help='Repetitions, best is reported (default: 5)')
+    startup.add_argument('--budget-ms', type=float, default=0,
+                         help='Exit with an error if importing the notifier takes longer (default: no budget)')
+    startup.set_defaults(func=benchmark_startup)
+
+    serve_parser = subparsers.add_parser('serve', help='Run the local Séneca and Telegram stand-ins')
+    serve_parser.add_argument('--rows', type=int, default=2000, help='Messages in the synthetic mailbox')
+    serve_parser.add_argument('--page-size', type=int, default=0, help='Rows per page, 0 for a single page')
+    serve_parser.set_defaults(func=serve)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -1,30 +1,1528 @@
 #!/usr/bin/env python3
 import json
-import requests
+import logging
 import time
 import os
 import hashlib
+import re
 import argparse
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
-from datetime import datetime
+import random
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+
+log = logging.getLogger('seneca_notifier')
+
+
+def import_selenium():
+    """Carga Selenium la primera vez que se necesita un navegador.
+    
+    Importarlo cuesta más que todo lo demás junto, y las consultas por HTTP o el envío
+    de la bandeja de salida no lo usan.
+    """
+    global webdriver, By, WebDriverWait, EC, Options, Service
+    global TimeoutException, NoSuchElementException, WebDriverException
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+
+
+def import_requests():
+    """Carga requests la primera vez que se hace una petición HTTP (portal o Telegram)"""
+    global requests
+    import requests
+    return requests
+
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Tiempos máximos de espera (segundos) por paso; se pueden cambiar con "timeouts" en config.json
+DEFAULT_TIMEOUTS = {
+    'page_load': 15,   # documento cargado tras navegar
+    'login_form': 15,  # aparición de los campos de login
+    'login': 15,       # cambio de URL tras pulsar "Entrar"
+    'messages': 15,    # navegación tras pulsar "Mensajes pendientes"
+    'table': 10,       # aparición de la tabla de noticias
+}
+
+# Lee en una sola llamada las celdas de la segunda tabla de la página (la de noticias).
+# Devuelve false mientras la tabla no exista, para poder usarlo como condición de espera.
+TABLE_ROWS_SCRIPT = """
+var tables = document.getElementsByTagName('table');
+if (tables.length < 2) { return false; }
+var rows = tables[1].getElementsByTagName('tr');
+var result = [];
+var links = [];
+for (var i = 0; i < rows.length; i++) {
+    var cells = rows[i].getElementsByTagName('td');
+    var texts = [];
+    for (var j = 0; j < cells.length; j++) { texts.push(cells[j].innerText.trim()); }
+    result.push(texts);
+    var anchors = rows[i].getElementsByTagName('a');
+    links.push(anchors.length ? anchors[0].href : null);
+}
+return {tables: tables.length, rows: result, links: links};
+"""
+
+# Huella de la tabla de noticias en una sola llamada: nº de filas, longitud y hash (djb2) de su texto.
+# Si coincide con la de la consulta anterior no hace falta leer ni procesar las filas.
+TABLE_FINGERPRINT_SCRIPT = """
+var tables = document.getElementsByTagName('table');
+if (tables.length < 2) { return null; }
+var text = tables[1].innerText;
+var hash = 5381;
+for (var i = 0; i < text.length; i++) { hash = ((hash << 5) + hash + text.charCodeAt(i)) | 0; }
+return tables[1].getElementsByTagName('tr').length + ':' + text.length + ':' + (hash >>> 0).toString(16);
+"""
+
+# Enlaces de la página de un mensaje que se consideran adjuntos
+ATTACHMENT_PATTERN = re.compile(r'(adjunto|descarga|fichero|\.(pdf|docx?|xlsx?|odt|ods|jpe?g|png|zip)(\?|$))', re.IGNORECASE)
+
+# Textos de los enlaces que llevan a la siguiente página de mensajes
+NEXT_PAGE_TEXTS = ['Siguiente', 'Página siguiente', '>', '>>', '»']
+
+# Formatos de la fecha de entrada de los mensajes; el primero que encaja se prueba antes en las siguientes filas
+DATE_FORMATS = [
+    '%d/%m/%Y',  # 12/03/2024
+    '%d/%m/%y',  # 12/03/24
+    '%Y-%m-%d',  # 2024-03-12
+    '%d-%m-%Y',  # 12-03-2024
+]
+
+# Estrategias para localizar elementos con Selenium, en el orden en que se prueban.
+# Cada una tiene un nombre y los localizadores de los elementos que deben aparecer juntos.
+# La que funciona se recuerda por portal en el estado de la cuenta y se prueba primero.
+# Los tipos de localizador son los valores de selenium.webdriver.common.by.By.
+CASE_INSENSITIVE_MENSAJES = "contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'mensajes')"
+LOGIN_FIELD_STRATEGIES = [
+    ('name_portal', ('name', 'USUARIO'), ('name', 'CLAVE_P')),
+    ('name_pasen', ('name', 'usuario'), ('name', 'clave')),
+    ('id_portal', ('id', 'USUARIO'), ('id', 'CLAVE_P')),
+    ('id_pasen', ('id', 'usuario'), ('id', 'clave')),
+    ('tipo', ('xpath', "//input[@type='text' or @type='email']"), ('xpath', "//input[@type='password']")),
+]
+LOGIN_BUTTON_STRATEGIES = [
+    ('boton_entrar', ('xpath', "//input[@type='button'][@value='Entrar']")),
+    ('value', ('xpath', "//input[@value='Entrar' or contains(@value, 'Acceder') or contains(@value, 'Login')]")),
+    ('texto', ('xpath', "//button[contains(text(), 'Entrar') or contains(text(), 'Acceder') or contains(text(), 'Login')]")),
+    ('submit', ('xpath', "//input[@type='submit']")),
+]
+MESSAGES_LINK_STRATEGIES = [
+    ('texto', ('link text', 'Mensajes pendientes')),
+    ('texto_parcial', ('partial link text', 'Mensajes')),
+    ('xpath', ('xpath', f"//a[{CASE_INSENSITIVE_MENSAJES}]")),
+    ('generico', ('xpath', f"//*[{CASE_INSENSITIVE_MENSAJES}]")),
+    ('pasen', ('partial link text', 'PASEN')),
+    ('pasen_minusculas', ('partial link text', 'Pasen')),
+]
+
+# Patrones de URL de los recursos que se pueden bloquear en Chrome ("block_resources")
+RESOURCE_EXTENSIONS = {
+    'image': ['png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'bmp'],
+    'font': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+    'stylesheet': ['css'],
+    'media': ['mp4', 'webm', 'ogg', 'mp3', 'wav'],
+}
+DEFAULT_BLOCKED_RESOURCES = ['image', 'font', 'media']
+
+# Estrategias de carga de página de Chrome: 'eager' no espera a imágenes ni hojas de estilo
+PAGE_LOAD_STRATEGIES = ('normal', 'eager')
+
+# Modos de extracción de la tabla en Selenium: 'bulk' (una llamada) o 'cells' (celda a celda)
+EXTRACTION_MODES = ('bulk', 'cells')
+
+# Valores por defecto del modo demonio (sección "daemon" de config.json)
+DEFAULT_DAEMON = {
+    'interval': 1800,      # segundos entre consultas
+    'jitter': 60,          # variación aleatoria (±segundos) para no consultar siempre a la misma hora
+    'max_backoff': 7200,   # espera máxima tras fallos consecutivos
+    'keep_browser': False, # mantener el navegador/sesión abiertos entre consultas
+    'metrics_file': None,  # fichero JSON con las métricas acumuladas, reescrito tras cada consulta
+    'metrics_port': None,  # puerto HTTP local para consultar las métricas (/metrics, /metrics.json)
+    'bot_commands': False, # atender /pending, /last y /refresh en los chats configurados
+    'refresh_min_interval': 300,  # segundos mínimos entre consultas pedidas con /refresh
+    'adaptive': False,     # ajustar el intervalo a las horas en que suelen llegar mensajes
+    'min_interval': 600,   # intervalo en las horas con más mensajes (modo adaptativo)
+    'max_interval': 7200,  # intervalo en las horas sin mensajes (modo adaptativo)
+    'learning_weeks': 8,   # semanas de historial que se tienen en cuenta
+    'quiet_hours': None,   # ["22:00", "07:00"]: no consultar en esa franja
+}
+
+# Contadores por consulta que se incluyen en el resumen y en las métricas
+RUN_COUNTERS = ('extraidas', 'nuevas', 'enviadas', 'fallidas')
+# Comparaciones de la huella de la tabla: sin cambios (no se extrae) o con cambios
+FINGERPRINT_COUNTERS = ('tabla_sin_cambios', 'tabla_con_cambios')
+
+# Cuándo se fuerza la escritura a disco (fsync): siempre, solo el registro de noticias
+# y la bandeja de salida, o nunca (menos escrituras en tarjetas SD)
+FSYNC_POLICIES = ('always', 'critical', 'never')
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(account)s] %(message)s'
+
+# Cuenta que se está procesando en cada hilo, para incluirla en los registros
+_log_context = threading.local()
+
+
+class AccountLogFilter(logging.Filter):
+    """Añade a cada registro la cuenta que se procesa en el hilo actual"""
+
+    def filter(self, record):
+        record.account = getattr(_log_context, 'account', None) or '-'
+        return True
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Un objeto JSON por línea, para sistemas de recogida de registros"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'account': getattr(record, 'account', '-'),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(level='INFO', log_format='text'):
+    """Configura la salida de registros: texto con hora, nivel y cuenta, o JSON"""
+    handler = logging.StreamHandler()
+    handler.addFilter(AccountLogFilter())
+    handler.setFormatter(JsonLogFormatter() if log_format == 'json' else logging.Formatter(LOG_FORMAT))
+    log.handlers = [handler]
+    log.setLevel(level.upper())
+    log.propagate = False
+
+# Motores de scraping disponibles; 'auto' prueba HTTP y recurre a Selenium si falla
+ENGINES = ('selenium', 'http', 'auto')
+
+
+class SenecaPageParser(HTMLParser):
+    """Extrae formularios, enlaces y tablas de una página HTML sin navegador"""
+
+    BLOCK_TAGS = {'br', 'p', 'div', 'li', 'tr'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+        self.links = []
+        self.tables = []
+        self.rows = []
+        self._form = None
+        self._links = []
+        self._tables = []
+        self._rows = []
+        self._cells = []
+        self._skip = 0
+        self.parts = []
+
+    def _write(self, text):
+        # El texto se acumula en todos los elementos abiertos, como hace .text en Selenium
+        self.parts.append(text)
+        for item in self._links + self._rows + self._cells:
+            item['parts'].append(text)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ('script', 'style'):
+            self._skip += 1
+        elif tag == 'form':
+            self._form = {
+                'action': attrs.get('action') or '',
+                'method': (attrs.get('method') or 'get').lower(),
+                'inputs': [],
+            }
+            self.forms.append(self._form)
+        elif tag == 'input' and self._form is not None:
+            self._form['inputs'].append({
+                'name': attrs.get('name'),
+                'id': attrs.get('id'),
+                'type': (attrs.get('type') or 'text').lower(),
+                'value': attrs.get('value') or '',
+            })
+        elif tag == 'a':
+            link = {'href': attrs.get('href'), 'parts': []}
+            self.links.append(link)
+            self._links.append(link)
+            for row in self._rows:
+                row['links'].append(link['href'])
+        elif tag == 'table':
+            table = []
+            self.tables.append(table)
+            self._tables.append(table)
+        elif tag == 'tr':
+            self._close_cells(len(self._tables))
+            self._close_rows(len(self._tables))
+            row = {'cells': [], 'links': [], 'parts': [], 'depth': len(self._tables)}
+            self.rows.append(row)
+            self._rows.append(row)
+            for table in self._tables:
+                table.append(row)
+        elif tag in ('td', 'th'):
+            self._close_cells(len(self._tables))
+            cell = {'parts': [], 'depth': len(self._tables)}
+            self._cells.append(cell)
+            if tag == 'td':
+                for row in self._rows:
+                    row['cells'].append(cell)
+        if tag in self.BLOCK_TAGS:
+            self._write('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCK_TAGS:
+            self._write('\n')
+        if tag in ('script', 'style'):
+            self._skip = max(0, self._skip - 1)
+        elif tag == 'form':
+            self._form = None
+        elif tag == 'a' and self._links:
+            self._links.pop()
+        elif tag == 'table' and self._tables:
+            self._close_cells(len(self._tables))
+            self._close_rows(len(self._tables))
+            self._tables.pop()
+        elif tag == 'tr':
+            self._close_cells(len(self._tables))
+            self._close_rows(len(self._tables))
+        elif tag in ('td', 'th'):
+            self._close_cells(len(self._tables))
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._write(data)
+
+    def _close_cells(self, depth):
+        while self._cells and self._cells[-1]['depth'] >= depth:
+            self._cells.pop()
+
+    def _close_rows(self, depth):
+        while self._rows and self._rows[-1]['depth'] >= depth:
+            self._rows.pop()
+
+    @staticmethod
+    def element_text(element):
+        """Normaliza el texto acumulado de un elemento como lo mostraría el navegador"""
+        lines = (' '.join(line.split()) for line in ''.join(element['parts']).split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+    def table_rows(self, index):
+        """Devuelve las filas de una tabla como listas de textos de celda"""
+        return [[self.element_text(cell) for cell in row['cells']] for row in self.tables[index]]
+
+    def table_row_links(self, index):
+        """Devuelve el primer enlace de cada fila de una tabla (o None)"""
+        return [row['links'][0] if row['links'] else None for row in self.tables[index]]
+
+    def text(self):
+        """Texto visible de toda la página"""
+        return self.element_text({'parts': self.parts})
+
+    def link_texts(self):
+        """Devuelve pares (texto, href) de los enlaces de la página"""
+        return [(self.element_text(link), link['href']) for link in self.links]
+
+
+def write_file_atomic(path, text, fsync=False, mode=0o666):
+    """Escribe un fichero entero en un temporal y lo renombra, para no dejarlo nunca a medias.
+    
+    Con fsync=True los datos y el renombrado llegan al disco antes de volver, así que sobreviven
+    también a un corte de luz.
+    """
+    temp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), 'w', encoding='utf-8') as f:
+            f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    if fsync and os.name == 'posix':
+        # El renombrado es una entrada del directorio: también hay que sincronizarlo
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def write_json_atomic(path, data, fsync=False, mode=0o666, indent=2):
+    write_file_atomic(path, json.dumps(data, ensure_ascii=False, indent=indent), fsync, mode)
+
+
+def boot_id():
+    """Identificador del arranque actual del sistema (solo Linux), o None"""
+    try:
+        with open('/proc/sys/kernel/random/boot_id', 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def process_start_time(pid):
+    """Momento en que arrancó un proceso, en ticks desde el arranque del sistema (solo Linux), o None"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            stat = f.read()
+        # El nombre del proceso va entre paréntesis y puede tener espacios; starttime es el campo 22
+        return int(stat.rsplit(')', 1)[1].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RunLock:
+    """Cerrojo de una cuenta entre procesos: un fichero con el PID de quien lo tiene.
+    
+    Evita que dos ejecuciones (un cron que se solapa con otro lento, o un cron con el demonio)
+    abran dos navegadores y se pisen el registro de noticias. Un cerrojo es abandonado si es de un
+    arranque anterior del sistema (tras un corte de luz los PID se repiten) o si su proceso ya no
+    existe o es otro con el mismo PID. Si no se puede saber (otra máquina, o sin /proc), cuando no
+    se ha renovado en stale_after segundos.
+    """
+
+    def __init__(self, path, stale_after=21600):
+        self.path = path
+        self.stale_after = stale_after
+        self.held = False
+
+    def acquire(self):
+        """Toma el cerrojo. Devuelve False si lo tiene otro proceso"""
+        if self.held:
+            # Quien lo mantiene entre consultas (el demonio) solo lo renueva
+            try:
+                os.utime(self.path)
+                return True
+            except FileNotFoundError:
+                self.held = False
+
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                if not self.is_stale():
+                    return False
+                log.warning(f"Eliminado el cerrojo abandonado {self.path}")
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'pid': os.getpid(), 'host': socket.gethostname(), 'boot_id': boot_id(),
+                           'process_start': process_start_time(os.getpid()),
+                           'inicio': datetime.now().isoformat()}, f)
+            self.held = True
+            return True
+        return False
+
+    def is_stale(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                owner = json.load(f)
+            age = time.time() - os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return True
+        except (OSError, ValueError):
+            # A medio escribir por otro proceso que acaba de tomarlo, o corrupto: se decide por la edad
+            try:
+                return time.time() - os.path.getmtime(self.path) > self.stale_after
+            except FileNotFoundError:
+                return True
+        
+        if owner.get('host') != socket.gethostname() or os.name != 'posix':
+            return age > self.stale_after
+        
+        current_boot = boot_id()
+        if owner.get('boot_id') and current_boot:
+            if owner['boot_id'] != current_boot:
+                return True
+        elif age > self.stale_after:
+            # Sin identificador de arranque no se puede descartar que el PID se haya repetido
+            return True
+        
+        try:
+            os.kill(owner['pid'], 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            # Existe, aunque sea de otro usuario
+            pass
+        # El PID puede ser de otro proceso que arrancó después de tomarse el cerrojo
+        started = process_start_time(owner['pid'])
+        return bool(owner.get('process_start') and started and started != owner['process_start'])
+
+    def release(self):
+        if self.held:
+            self.held = False
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def parse_html(html):
+    """Parsea una página HTML y devuelve el SenecaPageParser resultante"""
+    parser = SenecaPageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+class SessionStore:
+    """Caché en disco de la sesión de Séneca (cookies y URL tras el login) por cuenta"""
+
+    # Varias cuentas pueden compartir el mismo fichero desde hilos distintos
+    _lock = threading.Lock()
+
+    def __init__(self, path, ttl, fsync=False):
+        self.path = path
+        self.ttl = ttl
+        self.fsync = fsync
+
+    def _read(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+        return {}
+
+    def _write(self, sessions):
+        # Las cookies dan acceso a la cuenta: solo legibles por el usuario
+        write_json_atomic(self.path, sessions, self.fsync, mode=0o600)
+        os.chmod(self.path, 0o600)
+
+    def load(self, key):
+        """Devuelve la sesión guardada si existe y no ha caducado"""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._read().get(key)
+        if not entry or time.time() - entry.get('saved_at', 0) > self.ttl:
+            return None
+        return entry
+
+    def save(self, key, cookies, landing_url):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            sessions = self._read()
+            sessions[key] = {
+                'cookies': cookies,
+                'landing_url': landing_url,
+                'saved_at': time.time(),
+            }
+            self._write(sessions)
+
+    def invalidate(self, key):
+        with self._lock:
+            sessions = self._read()
+            if sessions.pop(key, None) is not None:
+                self._write(sessions)
+
+
+_chromedriver_lock = threading.Lock()
+_chromedriver_path = None
+
+
+def resolve_chromedriver(cache_file, refresh=False):
+    """Ruta de ChromeDriver: se resuelve una vez por proceso y se guarda en disco entre ejecuciones"""
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if not refresh:
+            if _chromedriver_path and os.path.exists(_chromedriver_path):
+                return _chromedriver_path
+            if os.path.exists(cache_file):
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    path = f.read().strip()
+                if path and os.path.exists(path):
+                    _chromedriver_path = path
+                    return path
+        
+        log.debug("Instalando/verificando ChromeDriver...")
+        from webdriver_manager.chrome import ChromeDriverManager
+        _chromedriver_path = ChromeDriverManager().install()
+        write_file_atomic(cache_file, _chromedriver_path)
+        return _chromedriver_path
+
+
+def process_tree_rss_mb(pid):
+    """Memoria residente (MB) de un proceso y sus descendientes, leyendo /proc (solo Linux)"""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children', 'r') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+class DriverPool:
+    """Reserva de navegadores Chrome abiertos que se reutilizan entre consultas y cuentas"""
+
+    # Segundos máximos esperando un navegador libre antes de dar la consulta por fallida
+    ACQUIRE_TIMEOUT = 600
+
+    def __init__(self, size=2, max_uses=50, max_memory_mb=0):
+        self.size = size
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.idle = []
+        self.uses = {}
+        self.created = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, create_driver):
+        """Devuelve un navegador libre y sano, creando uno si hay plaza o esperando si no"""
+        deadline = time.monotonic() + self.ACQUIRE_TIMEOUT
+        while True:
+            # Bajo el cerrojo solo se reparte: las llamadas a WebDriver (que pueden tardar si Chrome
+            # se ha colgado) se hacen fuera para no bloquear a las demás cuentas
+            with self.condition:
+                while not self.idle and self.created >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError(f"Ningún navegador de la reserva quedó libre en {self.ACQUIRE_TIMEOUT}s")
+                    self.condition.wait(remaining)
+                driver = self.idle.pop() if self.idle else None
+                if driver is None:
+                    self.created += 1
+            if driver is None:
+                break
+            if self.is_healthy(driver):
+                return driver
+            log.warning("Navegador de la reserva no responde, descartándolo")
+            self._discard(driver)
+        
+        try:
+            driver = create_driver()
+        except Exception:
+            with self.condition:
+                self.created -= 1
+                self.condition.notify()
+            raise
+        self.uses[id(driver)] = 0
+        return driver
+
+    def release(self, driver):
+        """Devuelve un navegador a la reserva, limpio, o lo cierra si toca reciclarlo"""
+        self.uses[id(driver)] = self.uses.get(id(driver), 0) + 1
+        recycle = self.uses[id(driver)] >= self.max_uses
+        
+        # Si Chrome o ChromeDriver han muerto no se lanza WebDriverException sino errores de
+        # conexión (urllib3): cualquier fallo descarta el navegador y libera su plaza
+        try:
+            if not recycle and self.max_memory_mb:
+                rss = process_tree_rss_mb(driver.service.process.pid)
+                if rss > self.max_memory_mb:
+                    log.warning(f"Navegador usa {rss:.0f} MB, reciclándolo")
+                    recycle = True
+            
+            if not recycle:
+                self.clear_state(driver)
+        except Exception as e:
+            log.warning(f"Navegador de la reserva no responde al liberarlo, descartándolo: {e}")
+            recycle = True
+        
+        if recycle:
+            self._discard(driver)
+        else:
+            with self.condition:
+                self.idle.append(driver)
+                self.condition.notify()
+
+    @staticmethod
+    def is_healthy(driver):
+        try:
+            return driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def clear_state(driver):
+        """Borra cookies y almacenamiento para que la siguiente cuenta empiece limpia"""
+        driver.delete_all_cookies()
+        try:
+            driver.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
+        except WebDriverException:
+            pass
+        driver.get('about:blank')
+
+    def _discard(self, driver):
+        """Cierra un navegador y libera su plaza (quit() se hace fuera del cerrojo)"""
+        with self.condition:
+            self.uses.pop(id(driver), None)
+            self.created -= 1
+            self.condition.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for driver in idle:
+            self._discard(driver)
+
+
+class JsonNewsStore:
+    """Registro de noticias procesadas en un fichero JSON (para instalaciones pequeñas)"""
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.news = self.load()
+        # El bot lee el registro desde su hilo mientras una consulta lo modifica
+        self.lock = threading.RLock()
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                # No empezar de cero en silencio: eso reenviaría todas las noticias
+                raise RuntimeError(f"No se pudo leer {self.path}: {e}")
+        return {}
+
+    def __contains__(self, news_hash):
+        return news_hash in self.news
+
+    def __len__(self):
+        return len(self.news)
+
+    def add(self, news_hash, title, processed_at, sender=''):
+        with self.lock:
+            self.news[news_hash] = {'title': title, 'processed_at': processed_at, 'sender': sender}
+
+    def get(self, news_hash):
+        """Datos de una noticia ({'title', 'processed_at', 'sender'}) o None"""
+        return self.news.get(news_hash)
+
+    def items(self):
+        """Pares (hash, {'title', 'processed_at', 'sender'}) de todas las noticias"""
+        with self.lock:
+            return list(self.news.items())
+
+    def latest(self, limit, accept=None):
+        """Las últimas noticias procesadas (las que cumplan accept, si se indica), de la más reciente a la más antigua"""
+        latest = sorted(self.items(), key=lambda item: item[1]['processed_at'], reverse=True)
+        if accept:
+            latest = [item for item in latest if accept(item[1])]
+        return latest[:limit]
+
+    def commit(self):
+        with self.lock:
+            write_json_atomic(self.path, self.news, self.fsync)
+
+    def prune(self, retention_days):
+        """Olvida las noticias procesadas hace más de retention_days días"""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        with self.lock:
+            old = [news_hash for news_hash, news in self.news.items() if news['processed_at'] < cutoff]
+            for news_hash in old:
+                del self.news[news_hash]
+        return len(old)
+
+    def close(self):
+        pass
+
+
+class SqliteNewsStore:
+    """Registro de noticias procesadas en SQLite: consultas por índice e inserciones incrementales"""
+
+    # Tras borrar tantas filas de una vez se compacta el fichero
+    VACUUM_THRESHOLD = 1000
+
+    # Nivel de sincronización de SQLite para cada política de fsync
+    SYNCHRONOUS = {'always': 'FULL', 'critical': 'NORMAL', 'never': 'OFF'}
+
+    def __init__(self, path, json_path=None, fsync='critical'):
+        self.path = path
+        import sqlite3
+        # Cada cuenta tiene su registro, pero cada consulta puede ir en un hilo distinto
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(f'PRAGMA synchronous={self.SYNCHRONOUS[fsync]}')
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS processed_news (
+                                 hash TEXT PRIMARY KEY,
+                                 title TEXT NOT NULL,
+                                 processed_at TEXT NOT NULL,
+                                 sender TEXT NOT NULL DEFAULT '')""")
+        # Registros de versiones anteriores, sin remitente
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(processed_news)')]
+        if 'sender' not in columns:
+            self.conn.execute("ALTER TABLE processed_news ADD COLUMN sender TEXT NOT NULL DEFAULT ''")
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_processed_at ON processed_news (processed_at)')
+        self.conn.commit()
+        if json_path:
+            self.migrate_json(json_path)
+
+    def migrate_json(self, json_path):
+        """Importa una sola vez el fichero JSON de versiones anteriores"""
+        if not os.path.exists(json_path) or len(self) > 0:
+            return
+        news = JsonNewsStore(json_path).news
+        self.conn.executemany('INSERT OR IGNORE INTO processed_news VALUES (?, ?, ?, ?)',
+                              [(news_hash, item.get('title', ''), item.get('processed_at', ''), item.get('sender', ''))
+                               for news_hash, item in news.items()])
+        self.conn.commit()
+        os.rename(json_path, json_path + '.migrado')
+        log.info(f"Migradas {len(news)} noticias de {json_path} a {self.path}")
+
+    def __contains__(self, news_hash):
+        row = self.conn.execute('SELECT 1 FROM processed_news WHERE hash = ?', (news_hash,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM processed_news').fetchone()[0]
+
+    def add(self, news_hash, title, processed_at, sender=''):
+        self.conn.execute('INSERT OR IGNORE INTO processed_news VALUES (?, ?, ?, ?)',
+                          (news_hash, title, processed_at, sender))
+
+    def get(self, news_hash):
+        """Datos de una noticia ({'title', 'processed_at', 'sender'}) o None"""
+        row = self.conn.execute('SELECT title, processed_at, sender FROM processed_news WHERE hash = ?',
+                                (news_hash,)).fetchone()
+        return {'title': row[0], 'processed_at': row[1], 'sender': row[2]} if row else None
+
+    def items(self):
+        """Pares (hash, {'title', 'processed_at', 'sender'}) de todas las noticias"""
+        rows = self.conn.execute('SELECT hash, title, processed_at, sender FROM processed_news')
+        return [(news_hash, {'title': title, 'processed_at': processed_at, 'sender': sender})
+                for news_hash, title, processed_at, sender in rows]
+
+    def latest(self, limit, accept=None):
+        """Las últimas noticias procesadas (las que cumplan accept, si se indica), de la más reciente a la más antigua"""
+        rows = self.conn.execute('SELECT hash, title, processed_at, sender FROM processed_news '
+                                 'ORDER BY processed_at DESC')
+        latest = []
+        for news_hash, title, processed_at, sender in rows:
+            news = {'title': title, 'processed_at': processed_at, 'sender': sender}
+            if accept is None or accept(news):
+                latest.append((news_hash, news))
+                if len(latest) == limit:
+                    break
+        return latest
+
+    def commit(self):
+        self.conn.commit()
+
+    def prune(self, retention_days):
+        """Olvida las noticias procesadas hace más de retention_days días"""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        deleted = self.conn.execute('DELETE FROM processed_news WHERE processed_at < ?', (cutoff,)).rowcount
+        self.conn.commit()
+        if deleted >= self.VACUUM_THRESHOLD:
+            self.conn.execute('VACUUM')
+        return deleted
+
+    def close(self):
+        self.conn.close()
+
+
+class PollSchedule:
+    """Intervalo entre consultas aprendido de las horas a las que se registraron las noticias.
+    
+    Para cada franja de una hora de la semana (día y hora) se cuenta en cuántas semanas llegó
+    alguna noticia, no cuántas llegaron: la primera consulta, que registra todo el buzón de golpe,
+    pesa como una semana más y no como cientos de mensajes. En la franja más habitual se consulta
+    cada min_interval segundos y en las que nunca tienen mensajes cada max_interval; el resto
+    queda en medio. La hora es la de detección, no la de envío en Séneca.
+    """
+
+    # Cada cuánto se vuelve a leer el historial del registro
+    RELEARN_INTERVAL = 6 * 3600
+
+    def __init__(self, store, min_interval, max_interval, learning_weeks):
+        self.store = store
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.learning_weeks = learning_weeks
+        self.counts = {}
+        self.peak = 0
+        self.learned_at = None
+
+    def learn(self):
+        cutoff = (datetime.now() - timedelta(weeks=self.learning_weeks)).isoformat()
+        active = set()
+        for _, news in self.store.items():
+            if news['processed_at'] >= cutoff:
+                processed_at = datetime.fromisoformat(news['processed_at'])
+                active.add((processed_at.date(), processed_at.hour))
+        counts = {}
+        for day, hour in active:
+            slot = (day.weekday(), hour)
+            counts[slot] = counts.get(slot, 0) + 1
+        self.counts = counts
+        self.peak = max(counts.values(), default=0)
+        self.learned_at = time.monotonic()
+
+    def slot_interval(self, moment):
+        """Intervalo para la franja de una fecha: más corto cuanto más mensajes suele haber"""
+        share = self.counts.get((moment.weekday(), moment.hour), 0) / self.peak
+        return self.max_interval - (self.max_interval - self.min_interval) * share ** 0.5
+
+    def next_delay(self, now):
+        """Segundos hasta la siguiente consulta, o None si todavía no hay historial.
+        
+        Si la franja actual es tranquila pero llega pronto una con más mensajes, la consulta
+        se adelanta al intervalo de esa franja en lugar de esperar el intervalo largo entero.
+        """
+        if self.learned_at is None or time.monotonic() - self.learned_at > self.RELEARN_INTERVAL:
+            self.learn()
+        if not self.peak:
+            return None
+        
+        slot_start = now.replace(minute=0, second=0, microsecond=0)
+        for hours in range(7 * 24 + 1):
+            start = slot_start + timedelta(hours=hours)
+            candidate = max(start, now + timedelta(seconds=self.slot_interval(start)))
+            if candidate < start + timedelta(hours=1):
+                return (candidate - now).total_seconds()
+        return self.max_interval
+
+
+def parse_quiet_hours(quiet_hours):
+    """Convierte las horas de silencio (["HH:MM", "HH:MM"]) en un par de horas, o None si no hay"""
+    if not quiet_hours:
+        return None
+    try:
+        if isinstance(quiet_hours, str) or len(quiet_hours) != 2:
+            raise ValueError
+        return tuple(datetime.strptime(value, '%H:%M').time() for value in quiet_hours)
+    except (TypeError, ValueError):
+        raise ValueError(f"Horas de silencio no válidas: {quiet_hours} (formato: [\"22:00\", \"07:00\"])")
+
+
+def quiet_hours_end(moment, quiet_hours):
+    """Si una fecha cae en las horas de silencio (ver parse_quiet_hours), devuelve cuándo terminan"""
+    if not quiet_hours:
+        return None
+    start, end = quiet_hours
+    current = moment.time()
+    # La franja puede cruzar la medianoche (22:00 - 07:00)
+    quiet = start <= current < end if start <= end else (current >= start or current < end)
+    if not quiet:
+        return None
+    end_moment = datetime.combine(moment.date(), end)
+    return end_moment if end_moment > moment else end_moment + timedelta(days=1)
+
+
+class StateStore:
+    """Pequeño estado persistente por cuenta (clave/valor en JSON) que se conserva entre consultas"""
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                # Es solo una caché: si se pierde se reconstruye
+                self.data = {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        if self.data.get(key) != value:
+            self.data[key] = value
+            self.save()
+
+    def save(self):
+        write_json_atomic(self.path, self.data, self.fsync)
+
+
+class Outbox:
+    """Bandeja de salida persistente: los mensajes quedan pendientes hasta que Telegram los acepta"""
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    def __init__(self, path, max_attempts=10, retention_days=7, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.max_attempts = max_attempts
+        self.retention_days = retention_days
+        self.messages = self.load()
+        # Los envíos a distintos chats se hacen en paralelo y actualizan la bandeja
+        self.lock = threading.RLock()
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+        return {}
+
+    def save(self):
+        with self.lock:
+            write_json_atomic(self.path, self.messages, self.fsync)
+
+    def add(self, message_id, chat_id, text, news_hashes, thread_id=None):
+        """Añade un mensaje pendiente (si no estaba ya en la bandeja)"""
+        with self.lock:
+            if message_id in self.messages:
+                return False
+            self.messages[message_id] = {
+                'chat_id': chat_id,
+                'thread_id': thread_id,
+                'text': text,
+                'news': news_hashes,
+                'status': self.PENDING,
+                'attempts': 0,
+                'created_at': datetime.now().isoformat(),
+            }
+            return True
+
+    def pending(self):
+        """Mensajes por enviar, los más antiguos primero"""
+        with self.lock:
+            items = [(message_id, message) for message_id, message in self.messages.items()
+                     if message['status'] == self.PENDING]
+        return sorted(items, key=lambda item: item[1]['created_at'])
+
+    def mark_sent(self, message_id):
+        with self.lock:
+            message = self.messages[message_id]
+            message['status'] = self.SENT
+            message['sent_at'] = datetime.now().isoformat()
+            message['attempts'] += 1
+
+    def mark_failed(self, message_id):
+        """Registra un intento fallido; tras max_attempts el mensaje deja de reintentarse"""
+        with self.lock:
+            message = self.messages[message_id]
+            message['attempts'] += 1
+            message['last_attempt_at'] = datetime.now().isoformat()
+            if message['attempts'] >= self.max_attempts:
+                message['status'] = self.FAILED
+
+    def prune(self):
+        """Elimina los mensajes enviados hace más de retention_days días"""
+        cutoff = time.time() - self.retention_days * 86400
+        with self.lock:
+            for message_id in [message_id for message_id, message in self.messages.items()
+                               if message['status'] == self.SENT and
+                               datetime.fromisoformat(message['sent_at']).timestamp() < cutoff]:
+                del self.messages[message_id]
+
+
+class TelegramSender:
+    """Envío a Telegram con sesión HTTP reutilizada, límites de ritmo y reintentos"""
+
+    # Telegram permite ~30 mensajes/s por bot, 1/s por chat y 20/min en grupos.
+    # Los turnos se comparten entre todas las cuentas que usan el mismo bot.
+    GLOBAL_INTERVAL = 1 / 30
+    CHAT_INTERVAL = 1.0
+    GROUP_INTERVAL = 3.0
+    MAX_LENGTH = 4096
+    # Espera máxima que se acepta de un 429: con más, el mensaje queda pendiente para otra consulta
+    MAX_RETRY_WAIT = 60
+
+    _rate_lock = threading.Lock()
+    _next_global = {}
+    _next_chat = {}
+
+    def __init__(self, telegram_config):
+        self.token = telegram_config['bot_token']
+        self.api_url = telegram_config.get('api_url', 'https://api.telegram.org').rstrip('/')
+        self.timeout = telegram_config.get('timeout', 15)
+        self.max_retries = telegram_config.get('max_retries', 5)
+        self.max_retry_wait = telegram_config.get('max_retry_wait', self.MAX_RETRY_WAIT)
+        # Una sola sesión para todos los hilos de envío, con una conexión por hilo en su reserva.
+        # Se crea con el primer mensaje: sin mensajes no hace falta cargar requests
+        self.pool_size = telegram_config.get('send_workers', 4)
+        self._session_lock = threading.Lock()
+        self.session = None
+
+    def _wait_turn(self, chat_id):
+        """Espera hasta que el mensaje cumpla los límites global y del chat"""
+        # Los chats de grupo tienen identificador negativo
+        chat_interval = self.GROUP_INTERVAL if str(chat_id).startswith('-') else self.CHAT_INTERVAL
+        chat_key = (self.token, str(chat_id))
+        with self._rate_lock:
+            now = time.monotonic()
+            turn = max(now, self._next_global.get(self.token, 0), self._next_chat.get(chat_key, 0))
+            self._next_global[self.token] = turn + self.GLOBAL_INTERVAL
+            self._next_chat[chat_key] = turn + chat_interval
+        if turn > now:
+            time.sleep(turn - now)
+
+    def _session(self):
+        with self._session_lock:
+            if self.session is None:
+                self.session = import_requests().Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                self.session.mount('https://', adapter)
+                self.session.mount('http://', adapter)
+            return self.session
+
+    def send(self, chat_id, text, thread_id=None):
+        """Envía un mensaje reintentando errores temporales. Devuelve True si se entregó"""
+        url = f"{self.api_url}/bot{self.token}/sendMessage"
+        data = {
+            'chat_id': chat_id,
+            'text': text,
+            'parse_mode': 'HTML'
+        }
+        # Tema (hilo) de un grupo con foros
+        if thread_id:
+            data['message_thread_id'] = thread_id
+        session = self._session()
+        
+        for attempt in range(self.max_retries + 1):
+            self._wait_turn(chat_id)
+            delay = 2 ** attempt
+            try:
+                response = session.post(url, data=data, timeout=self.timeout)
+            except requests.RequestException as e:
+                log.warning(f"Error enviando mensaje por Telegram: {e}")
+            else:
+                if response.status_code == 200:
+                    return True
+                if response.status_code == 429:
+                    # Telegram indica cuánto hay que esperar antes de reintentar
+                    try:
+                        delay = response.json()['parameters']['retry_after']
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                    if delay > self.max_retry_wait:
+                        # Esperar aquí pararía la consulta (y el demonio) todo ese tiempo
+                        log.warning(f"Telegram pide esperar {delay}s antes de reintentar, se deja pendiente")
+                        return False
+                    log.warning(f"Telegram limita el ritmo de envío, esperando {delay}s")
+                elif response.status_code < 500:
+                    log.warning(f"Telegram rechazó el mensaje ({response.status_code}): {response.text[:200]}")
+                    return False
+                else:
+                    log.warning(f"Error de Telegram ({response.status_code})")
+            
+            if attempt < self.max_retries:
+                time.sleep(delay)
+        
+        return False
+
+    def close(self):
+        with self._session_lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+
+class SeleniumEngine:
+    """Motor basado en Chrome headless (comportamiento original)"""
+
+    name = 'selenium'
+
+    def __init__(self, notifier):
+        self.notifier = notifier
+        self.driver = None
+        self.driver_pool = notifier.driver_pool
+
+    def start(self):
+        if self.driver_pool:
+            self.driver = self.driver_pool.acquire(self.notifier.init_driver)
+        else:
+            self.driver = self.notifier.init_driver()
+
+    def login(self):
+        if self.restore_session():
+            return True
+        if not self.notifier.login_to_seneca(self.driver):
+            return False
+        self.notifier.save_session(self.cookies(), self.driver.current_url)
+        return True
+
+    def cookies(self):
+        """Cookies de la sesión actual en formato serializable"""
+        return [{k: c[k] for k in ('name', 'value', 'domain', 'path', 'secure') if k in c}
+                for c in self.driver.get_cookies()]
+
+    def restore_session(self):
+        """Reutiliza la sesión guardada si el portal la sigue aceptando"""
+        session = self.notifier.load_session()
+        if not session:
+            return False
+
+        # Las cookies solo se pueden añadir estando en el dominio del portal
+        self.driver.get(self.notifier.config['seneca']['url'])
+        self.driver.delete_all_cookies()
+        for cookie in session['cookies']:
+            try:
+                self.driver.add_cookie(cookie)
+            except WebDriverException:
+                continue
+
+        self.driver.get(session['landing_url'])
+        if (self.driver.find_elements(By.XPATH, "//input[@type='password']") or
+                not self.notifier.is_login_successful(self.driver.current_url)):
+            log.info("Sesión guardada no válida, haciendo login completo")
+            self.notifier.invalidate_session()
+            self.driver.delete_all_cookies()
+            return False
+
+        log.info("Sesión guardada reutilizada")
+        return True
+
+    def is_messages_page(self):
+        """Comprueba que la página actual es la de mensajes (con su tabla) y no la de login"""
+        try:
+            page = WebDriverWait(self.driver, self.notifier.timeouts['table']).until(
+                lambda d: 'login' if d.find_elements(By.XPATH, "//input[@type='password']")
+                else len(d.find_elements(By.TAG_NAME, 'table')) > 1)
+        except TimeoutException:
+            return False
+        return page is True
+
+    def open_messages(self):
+        landing_url = self.driver.current_url
+        messages_url = self.notifier.messages_url()
+        if messages_url:
+            self.driver.get(messages_url)
+            if self.is_messages_page():
+                log.debug("Acceso directo a mensajes pendientes")
+                return True
+            self.notifier.forget_messages_url()
+            self.driver.get(landing_url)
+
+        if not self.notifier.click_messages_pending(self.driver):
+            return False
+        if self.driver.current_url != landing_url and self.is_messages_page():
+            self.notifier.remember_messages_url(self.driver.current_url)
+        return True
+
+    def extract_news(self):
+        return self.notifier.extract_news(self.driver)
+
+    def fingerprint(self):
+        return self.notifier.read_table_fingerprint(self.driver)
+
+    def iter_news_pages(self):
+        return self.notifier.iter_news_pages(self.driver)
+
+    def quit(self):
+        if self.driver:
+            if self.driver_pool:
+                self.driver_pool.release(self.driver)
+            else:
+                self.driver.quit()
+            self.driver = None
+
+
+class HttpEngine:
+    """Motor sin navegador: requests.Session y parser HTML de la biblioteca estándar"""
+
+    name = 'http'
+
+    # Pares (usuario, clave) de nombres de campo conocidos del formulario de login
+    LOGIN_FIELDS = [('USUARIO', 'CLAVE_P'), ('usuario', 'clave')]
+
+    def __init__(self, notifier):
+        self.notifier = notifier
+        self.config = notifier.config
+        self.timeout = self.config.get('http_timeout', 30)
+        self.session = None
+        self.current_url = None
+        self.page = None
+
+    def start(self):
+        self.session = import_requests().Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+
+    def fetch(self, method, url, **kwargs):
+        """Hace una petición y parsea la página resultante"""
+        response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        self.current_url = response.url
+        self.page = parse_html(response.text)
+        return response
+
+    def find_login_form(self):
+        """Busca el formulario que contiene un campo de contraseña"""
+        for form in self.page.forms:
+            if any(field['type'] == 'password' for field in form['inputs']):
+                return form
+        return None
+
+    def restore_session(self):
+        """Reutiliza la sesión guardada si el portal la sigue aceptando"""
+        session = self.notifier.load_session()
+        if not session:
+            return False
+
+        for cookie in session['cookies']:
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+
+        self.fetch('GET', session['landing_url'])
+        if self.find_login_form() or not self.notifier.is_login_successful(self.current_url):
+            log.info("Sesión guardada no válida, haciendo login completo")
+            self.notifier.invalidate_session()
+            self.session.cookies.clear()
+            return False
+
+        log.info("Sesión guardada reutilizada")
+        return True
+
+    def login(self):
+        if self.restore_session():
+            return True
+
+        url = self.config['seneca']['url']
+        log.debug(f"Navegando a: {url}")
+        self.fetch('GET', url)
+
+        form = self.find_login_form()
+        if not form:
+            log.warning("No se encontró el formulario de login")
+            return False
+
+        names = {field['name'] for field in form['inputs'] if field['name']}
+        username_name = password_name = None
+        for user_field, password_field in self.LOGIN_FIELDS:
+            if user_field in names and password_field in names:
+                username_name, password_name = user_field, password_field
+                log.debug(f"Campos encontrados por 'name': {user_field}/{password_field}")
+                break
+        else:
+            text_inputs = [f['name'] for f in form['inputs'] if f['type'] in ('text', 'email') and f['name']]
+            password_inputs = [f['name'] for f in form['inputs'] if f['type'] == 'password' and f['name']]
+            if text_inputs and password_inputs:
+                username_name, password_name = text_inputs[0], password_inputs[0]
+                log.debug("Campos encontrados por tipo de input")
+
+        if not username_name:
+            log.warning("No se pudieron encontrar los campos de login")
+            return False
+
+        # Campos ocultos y valores por defecto del formulario
+        data = {}
+        for field in form['inputs']:
+            if field['name'] and field['type'] not in ('button', 'submit', 'image', 'reset'):
+                data[field['name']] = field['value']
+        data[username_name] = self.config['seneca']['username']
+        data[password_name] = self.config['seneca']['password']
+
+        action = urljoin(self.current_url, form['action'] or self.current_url)
+        log.debug("Enviando formulario de login")
+        if form['method'] == 'post':
+            self.fetch('POST', action, data=data)
+        else:
+            self.fetch('GET', action, params=data)
+
+        log.debug(f"URL después del login: {self.current_url}")
+        if self.find_login_form() or not self.notifier.is_login_successful(self.current_url):
+            log.warning("Login falló - el portal devolvió la página de acceso")
+            return False
+
+        log.debug("Login aparentemente exitoso")
+        self.notifier.save_session(self.cookies(), self.current_url)
+        return True
+
+    def cookies(self):
+        """Cookies de la sesión actual en formato serializable"""
+        return [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path, 'secure': c.secure}
+                for c in self.session.cookies]
+
+    def is_messages_page(self):
+        """Comprueba que la página actual es la de mensajes (con su tabla) y no la de login"""
+        return len(self.page.tables) > 1 and not self.find_login_form()
+
+    def open_messages(self):
+        landing_url = self.current_url
+        messages_url = self.notifier.messages_url()
+        if messages_url:
+            try:
+                self.fetch('GET', messages_url)
+                direct = self.is_messages_page()
+            except requests.HTTPError:
+                direct = False
+            if direct:
+                log.debug("Acceso directo a mensajes pendientes")
+                return True
+            self.notifier.forget_messages_url()
+            self.fetch('GET', landing_url)
+
+        if not self.follow_messages_link():
+            return False
+        if self.current_url != landing_url and self.is_messages_page():
+            self.notifier.remember_messages_url(self.current_url)
+        return True
+
+    def follow_messages_link(self):
+        log.debug("Buscando 'Mensajes pendientes' en la página...")
+        links = [(text, href) for text, href in self.page.link_texts()
+                 if href and not href.lower().startswith('javascript:')]
+
+        matchers = [
+            lambda text: text == 'Mensajes pendientes',
+            lambda text: 'mensajes' in text.lower(),
+            lambda text: 'pasen' in text.lower(),
+        ]
+        for matches in matchers:
+            for text, href in links:
+                if matches(text):
+                    log.debug(f"✓ Siguiendo enlace: '{text}'")
+                    self.fetch('GET', urljoin(self.current_url, href))
+                    log.debug(f"Nueva URL: {self.current_url}")
+                    return True
+
+        log.warning("✗ No se pudo encontrar el enlace 'Mensajes pendientes'")
+        return False
+
+    def extract_news(self):
+        news_list = []
+        log.debug("Buscando tabla de noticias...")
+        log.debug(f"Encontradas {len(self.page.tables)} tablas")
+
+        if len(self.page.tables) > 1:
+            log.debug("Usando Tabla 1 para extraer noticias")
+            links = [urljoin(self.current_url, href) if href else None for href in self.page.table_row_links(1)]
+            news_list = self.notifier.news_from_rows(self.page.table_rows(1), links)
+        else:
+            log.warning("No se encontró la tabla de noticias esperada")
+            rows = [SenecaPageParser.element_text(row) for row in self.page.rows if row['cells']]
+            news_list = self.notifier.news_from_row_texts(rows)
+
+        log.debug(f"Total de noticias extraídas: {len(news_list)}")
+        return news_list
+
+    def fingerprint(self):
+        """Huella de la tabla de noticias de la página actual (ya descargada)"""
+        if len(self.page.tables) < 2:
+            return None
+        rows = json.dumps(self.page.table_rows(1), ensure_ascii=False)
+        return hashlib.md5(rows.encode('utf-8')).hexdigest()
+
+    def iter_news_pages(self):
+        """Genera las noticias de cada página siguiendo los enlaces de página siguiente"""
+        yield self.extract_news()
+
+        for page_number in range(2, self.notifier.max_pages + 1):
+            next_links = [href for text, href in self.page.link_texts()
+                          if text in self.notifier.next_page_texts and href
+                          and not href.lower().startswith('javascript:')]
+            if not next_links:
+                return
+            log.debug(f"Página {page_number} de mensajes")
+            self.fetch('GET', urljoin(self.current_url, next_links[0]))
+            yield self.extract_news()
+
+    def quit(self):
+        if self.session:
+            self.session.close()
+            self.session = None
 
 
 class SenecaNotifier:
-    def __init__(self, config_file='config.json', date_filter=None):
+    def __init__(self, config_file='config.json', date_filter=None, engine=None, account=None):
         with open(config_file, 'r', encoding='utf-8') as f:
             self.config = json.load(f)
         
+        self.account = account
+        if account:
+            self.config = account_config(self.config, account)
+        
         self.data_file = self.config['data_file']
-        self.processed_news = self.load_processed_news()
+        self.fsync = self.config.get('fsync', 'critical')
+        if self.fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Política de fsync desconocida: {self.fsync} (opciones: {', '.join(FSYNC_POLICIES)})")
+        self.run_lock = RunLock(self.config.get('lock_file', os.path.splitext(self.data_file)[0] + '.lock'),
+                                self.config.get('lock_stale_after', 21600))
+        self.keep_lock = False
+        self.open_stores()
         self.date_filter = date_filter
+        # El filtro de fecha (YYYYMMDD) se convierte una sola vez
+        try:
+            self.filter_date = datetime.strptime(date_filter, '%Y%m%d').date() if date_filter else None
+        except ValueError:
+            raise ValueError(f"Fecha de filtro no válida: {date_filter} (formato: YYYYMMDD)")
+        self.date_formats = list(DATE_FORMATS)
+        self.session_store = SessionStore(self.config.get('session_file', 'sesion_seneca.json'),
+                                          self.config.get('session_ttl', 1800), self.fsync == 'always')
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **self.config.get('timeouts', {}))
+        self.timings = {}
+        self.counters = dict.fromkeys(RUN_COUNTERS + FINGERPRINT_COUNTERS, 0)
+        self.send_latencies = []
+        self.skip_unchanged = self.config.get('skip_unchanged', True)
+        self.table_fingerprint = None
+        self.table_unchanged = False
+        self.newest_hash = None
+        self.engine_name = None
+        self.daemon = dict(DEFAULT_DAEMON, **self.config.get('daemon', {}))
+        self.quiet_hours = parse_quiet_hours(self.daemon['quiet_hours'])
+        if self.daemon['min_interval'] > self.daemon['max_interval']:
+            raise ValueError(f"daemon.min_interval ({self.daemon['min_interval']}) es mayor que "
+                             f"daemon.max_interval ({self.daemon['max_interval']})")
+        self.keep_engines = False
+        self.engines = {}
+        self.driver_pool = None
+        self.telegram = TelegramSender(self.config['telegram'])
+        self.targets = self.telegram_targets()
+        self.incremental = self.config.get('incremental', False)
+        self.fetch_bodies = self.config.get('fetch_bodies', False)
+        self.body_cache_dir = self.config.get('body_cache_dir', os.path.splitext(self.data_file)[0] + '_mensajes')
+        self.detail_cookies = []
+        self.reached_known = False
+        self.max_pages = self.config.get('max_pages', 1)
+        self.next_page_texts = self.config.get('next_page_texts', NEXT_PAGE_TEXTS)
+        self.extraction = self.config.get('extraction', 'bulk')
+        if self.extraction not in EXTRACTION_MODES:
+            raise ValueError(f"Modo de extracción desconocido: {self.extraction} (opciones: {', '.join(EXTRACTION_MODES)})")
+        self.engine = engine or self.config.get('engine', 'selenium')
+        if self.engine not in ENGINES:
+            raise ValueError(f"Motor desconocido: {self.engine} (opciones: {', '.join(ENGINES)})")
         
+        # Perfil ligero de Chrome (ver build_chrome_options)
+        self.block_resources = self.config.get('block_resources', DEFAULT_BLOCKED_RESOURCES)
+        unknown = set(self.block_resources) - set(RESOURCE_EXTENSIONS)
+        if unknown:
+            raise ValueError(f"Recursos desconocidos en block_resources: {', '.join(sorted(unknown))} "
+                             f"(opciones: {', '.join(RESOURCE_EXTENSIONS)})")
+        self.page_load_strategy = self.config.get('page_load_strategy', 'normal')
+        if self.page_load_strategy not in PAGE_LOAD_STRATEGIES:
+            raise ValueError(f"Estrategia de carga desconocida: {self.page_load_strategy} "
+                             f"(opciones: {', '.join(PAGE_LOAD_STRATEGIES)})")
+        self.chrome_options = None
+    
+    def build_chrome_options(self):
+        """Opciones de Chrome; se construyen al crear el primer navegador"""
         # Configurar Chrome con más opciones para estabilidad
         self.chrome_options = Options()
         self.chrome_options.add_argument('--headless')
@@ -33,127 +1531,276 @@ class SenecaNotifier:
         self.chrome_options.add_argument('--disable-gpu')
         self.chrome_options.add_argument('--disable-extensions')
         self.chrome_options.add_argument('--disable-plugins')
-        self.chrome_options.add_argument('--disable-images')
         self.chrome_options.add_argument('--window-size=1920,1080')
-        self.chrome_options.add_argument('--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        self.chrome_options.add_argument(f'--user-agent={USER_AGENT}')
+        
+        # Perfil ligero: Chrome ignora --disable-images, así que las imágenes se desactivan
+        # con la preferencia de contenido y el resto de recursos se bloquea por CDP al crear el driver
+        if 'image' in self.block_resources:
+            self.chrome_options.add_experimental_option(
+                'prefs', {'profile.managed_default_content_settings.images': 2})
+            self.chrome_options.add_argument('--blink-settings=imagesEnabled=false')
         
-        # Configurar el servicio de ChromeDriver
-        self.service = None
+        # Con block_third_party solo se resuelven el host del portal y los de allowed_hosts
+        if self.config.get('block_third_party', False):
+            hosts = [urlparse(self.config['seneca']['url']).hostname] + self.config.get('allowed_hosts', [])
+            rules = ', '.join(['MAP * ~NOTFOUND'] + [f'EXCLUDE {host}' for host in hosts])
+            self.chrome_options.add_argument(f'--host-resolver-rules={rules}')
+        
+        self.chrome_options.page_load_strategy = self.page_load_strategy
+        return self.chrome_options
+    
+    def open_stores(self):
+        """Carga el registro de noticias, el estado y la bandeja de salida de la cuenta"""
+        self.processed_news = self.load_processed_news()
+        self.schedule = None
+        self.state = StateStore(self.config.get('state_file', os.path.splitext(self.data_file)[0] + '_estado.json'),
+                                self.fsync == 'always')
+        self.outbox = Outbox(self.config.get('outbox_file', os.path.splitext(self.data_file)[0] + '_salida.json'),
+                             self.config.get('outbox_max_attempts', 10),
+                             self.config.get('outbox_retention_days', 7),
+                             self.fsync != 'never')
+    
+    def acquire_run_lock(self):
+        """Toma el cerrojo de la cuenta. Devuelve False si lo tiene otra ejecución.
+        
+        Los ficheros de la cuenta se releen al tomarlo: se cargaron al crear el notificador y otra
+        ejecución ha podido cambiarlos mientras tenía el cerrojo.
+        """
+        if self.run_lock.held:
+            return self.run_lock.acquire()
+        if not self.run_lock.acquire():
+            return False
+        self.processed_news.close()
+        self.open_stores()
+        return True
     
     def load_processed_news(self):
-        """Carga las noticias ya procesadas desde el archivo JSON"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        """Abre el registro de noticias ya procesadas (JSON o SQLite según "store")"""
+        store = self.config.get('store', 'json')
+        if store == 'sqlite':
+            db_file = self.config.get('store_file', os.path.splitext(self.data_file)[0] + '.db')
+            return SqliteNewsStore(db_file, json_path=self.data_file, fsync=self.fsync)
+        if store == 'json':
+            return JsonNewsStore(self.data_file, self.fsync != 'never')
+        raise ValueError(f"Registro desconocido: {store} (opciones: json, sqlite)")
     
     def save_processed_news(self):
-        """Guarda las noticias procesadas en el archivo JSON"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.processed_news, f, ensure_ascii=False, indent=2)
+        """Guarda las noticias procesadas y aplica la política de retención"""
+        retention_days = self.config.get('store_retention_days', 0)
+        if retention_days:
+            self.processed_news.prune(retention_days)
+        self.processed_news.commit()
+    
+    def session_key(self):
+        """Clave de la sesión guardada: portal y usuario"""
+        return f"{self.config['seneca']['url']}|{self.config['seneca']['username']}"
+    
+    def load_session(self):
+        return self.session_store.load(self.session_key())
+    
+    def save_session(self, cookies, landing_url):
+        self.session_store.save(self.session_key(), cookies, landing_url)
+    
+    def invalidate_session(self):
+        self.session_store.invalidate(self.session_key())
+    
+    def messages_url(self):
+        """URL de mensajes pendientes: la configurada o la aprendida en una consulta anterior"""
+        return (self.config['seneca'].get('messages_url') or
+                self.state.get('messages_urls', {}).get(self.config['seneca']['url']))
+    
+    def remember_messages_url(self, url):
+        """Guarda la URL a la que llevó el enlace para ir directamente la próxima vez"""
+        urls = self.state.get('messages_urls', {})
+        self.state.set('messages_urls', dict(urls, **{self.config['seneca']['url']: url}))
+    
+    def forget_messages_url(self):
+        """Descarta la URL aprendida cuando deja de llevar a la tabla de mensajes"""
+        if self.config['seneca'].get('messages_url'):
+            log.warning("La URL de mensajes configurada no lleva a la tabla, buscando el enlace")
+            return
+        log.info("El acceso directo a mensajes pendientes ya no funciona, buscando el enlace")
+        urls = dict(self.state.get('messages_urls', {}))
+        urls.pop(self.config['seneca']['url'], None)
+        self.state.set('messages_urls', urls)
     
     def generate_news_hash(self, title, content=""):
         """Genera un hash único para una noticia"""
         return hashlib.md5((title + content).encode('utf-8')).hexdigest()
     
+    def generate_news_id(self, date_info, sender, title):
+        """Identificador estable de un mensaje: no cambia cuando el mensaje se marca como leído"""
+        return hashlib.md5(f"{date_info}|{sender}|{title}".encode('utf-8')).hexdigest()
+    
+    def is_known(self, news):
+        """Indica si la noticia ya se procesó, con el identificador actual o el antiguo"""
+        if news['hash'] in self.processed_news:
+            return True
+        legacy = self.processed_news.get(news['legacy_hash']) if news.get('legacy_hash') else None
+        if legacy:
+            # Registrar también el identificador estable para las próximas consultas, con la fecha
+            # original (para la retención y las consultas adaptativas no es una noticia nueva)
+            self.processed_news.add(news['hash'], news['title'], legacy['processed_at'], news.get('sender', ''))
+            return True
+        return False
+    
     def init_driver(self):
         """Inicializa el driver de Chrome con manejo de errores"""
+        import_selenium()
+        if self.chrome_options is None:
+            self.build_chrome_options()
+        
         try:
             # Intentar con ChromeDriver local primero
             if os.path.exists('./chromedriver'):
-                print("Usando ChromeDriver local...")
-                self.service = Service('./chromedriver')
-                driver = webdriver.Chrome(service=self.service, options=self.chrome_options)
-                return driver
+                log.debug("Usando ChromeDriver local...")
+                driver = webdriver.Chrome(service=Service('./chromedriver'), options=self.chrome_options)
+                return self.block_driver_resources(driver)
             
         except Exception as e:
-            print(f"Error con ChromeDriver local: {e}")
+            log.warning(f"Error con ChromeDriver local: {e}")
         
+        cache_file = self.config.get('chromedriver_cache', '.chromedriver_path')
         try:
-            # Fallback: intentar usar ChromeDriverManager
-            if self.service is None:
-                print("Instalando/verificando ChromeDriver...")
-                self.service = Service(ChromeDriverManager().install())
-            
-            driver = webdriver.Chrome(service=self.service, options=self.chrome_options)
-            return driver
+            # Fallback: intentar usar ChromeDriverManager (ruta cacheada entre ejecuciones)
+            path = resolve_chromedriver(cache_file)
+            try:
+                driver = webdriver.Chrome(service=Service(path), options=self.chrome_options)
+            except WebDriverException:
+                # La ruta cacheada puede haber quedado obsoleta tras actualizar Chrome
+                path = resolve_chromedriver(cache_file, refresh=True)
+                driver = webdriver.Chrome(service=Service(path), options=self.chrome_options)
+            return self.block_driver_resources(driver)
             
         except Exception as e:
-            print(f"Error inicializando ChromeDriver con webdriver-manager: {e}")
+            log.warning(f"Error inicializando ChromeDriver con webdriver-manager: {e}")
             
             # Fallback final: intentar con driver del sistema
             try:
-                print("Intentando con ChromeDriver del sistema...")
+                log.debug("Intentando con ChromeDriver del sistema...")
                 driver = webdriver.Chrome(options=self.chrome_options)
-                return driver
+                return self.block_driver_resources(driver)
             except Exception as e2:
-                print(f"Error con ChromeDriver del sistema: {e2}")
+                log.error(f"Error con ChromeDriver del sistema: {e2}")
                 raise Exception(f"No se pudo inicializar Chrome. Asegúrate de tener Chrome instalado: {e2}")
     
+    def block_driver_resources(self, driver):
+        """Bloquea por CDP las descargas de los tipos de recurso de "block_resources" """
+        patterns = []
+        for kind in self.block_resources:
+            for extension in RESOURCE_EXTENSIONS[kind]:
+                patterns += [f'*.{extension}', f'*.{extension}?*']
+        if patterns:
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            except WebDriverException as e:
+                log.warning(f"No se pudieron bloquear los recursos de las páginas: {e}")
+        return driver
+    
+    @contextmanager
+    def timed_step(self, name):
+        """Mide la duración de un paso para el informe de tiempos"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0) + time.perf_counter() - start
+    
+    def print_timings(self):
+        """Muestra el informe de tiempos por paso"""
+        if self.timings:
+            report = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.timings.items())
+            log.info(f"Tiempos por paso: {report}")
+    
+    def print_counters(self):
+        """Muestra el resumen de noticias de la consulta y la latencia de envío"""
+        report = ", ".join(f"{name} {value}" for name, value in self.counters.items())
+        if self.send_latencies:
+            average = sum(self.send_latencies) / len(self.send_latencies)
+            report += f", envío medio {average:.2f}s (máx. {max(self.send_latencies):.2f}s)"
+        log.info(f"Resumen: {report}")
+    
+    def wait_for_page_ready(self, driver, step='page_load'):
+        """Espera a que el documento termine de cargar (document.readyState)"""
+        # Con carga 'eager' basta con el DOM listo, sin esperar a imágenes y estilos
+        ready_states = ('interactive', 'complete') if self.page_load_strategy == 'eager' else ('complete',)
+        try:
+            WebDriverWait(driver, self.timeouts[step]).until(
+                lambda d: d.execute_script('return document.readyState') in ready_states)
+        except TimeoutException:
+            log.warning(f"La página no terminó de cargar en {self.timeouts[step]}s")
+    
+    def is_login_successful(self, current_url):
+        """Comprueba por la URL si el login ha tenido éxito"""
+        # Si la URL cambió y contiene "nav/" significa que el login fue exitoso
+        return (current_url != self.config['seneca']['url'] and
+                ("nav/" in current_url or "pasen" in current_url.lower()) and
+                "error" not in current_url.lower())
+    
+    def find_elements_by_strategies(self, driver, kind, strategies, timeout=0):
+        """Localiza elementos probando estrategias en orden. Devuelve sus elementos o None.
+        
+        La estrategia que funcionó la última vez en este portal se prueba primero; si deja
+        de encontrar nada se recorre la lista completa y se recuerda la nueva (o se olvida
+        si ninguna funciona). Con timeout se espera a que funcione alguna, en una sola espera.
+        """
+        portal = self.config['seneca']['url']
+        cache = self.state.get('selectores', {})
+        cached = cache.get(portal, {}).get(kind)
+        ordered = sorted(strategies, key=lambda strategy: strategy[0] != cached)
+        
+        def attempt(d):
+            for name, *locators in ordered:
+                found = []
+                for by, value in locators:
+                    elements = d.find_elements(by, value)
+                    if not elements:
+                        break
+                    found.append(elements[0])
+                else:
+                    return name, found
+            return False
+        
+        try:
+            result = WebDriverWait(driver, timeout).until(attempt) if timeout else attempt(driver)
+        except TimeoutException:
+            result = False
+        
+        name, elements = result or (None, None)
+        if name != cached:
+            if cached:
+                log.debug(f"La estrategia guardada '{cached}' para '{kind}' ya no funciona")
+            selectors = dict(cache.get(portal, {}))
+            if name:
+                selectors[kind] = name
+            else:
+                selectors.pop(kind, None)
+            self.state.set('selectores', dict(cache, **{portal: selectors}))
+        if name:
+            log.debug(f"'{kind}' encontrado con la estrategia '{name}'")
+        return elements
+    
     def login_to_seneca(self, driver):
         """Realiza login en Séneca"""
         try:
-            print(f"Navegando a: {self.config['seneca']['url']}")
+            log.debug(f"Navegando a: {self.config['seneca']['url']}")
             driver.get(self.config['seneca']['url'])
             
             # Esperar a que cargue la página
-            time.sleep(3)
-            print(f"Página cargada. Título: {driver.title}")
+            self.wait_for_page_ready(driver)
+            log.debug(f"Página cargada. Título: {driver.title}")
             
-            # Buscar formulario de login con múltiples estrategias
-            wait = WebDriverWait(driver, 15)
-            
-            username_field = None
-            password_field = None
-            
-            # Estrategia 1: Por name (nombres correctos del portal)
-            try:
-                username_field = wait.until(EC.presence_of_element_located((By.NAME, 'USUARIO')))
-                password_field = driver.find_element(By.NAME, 'CLAVE_P')
-                print("Campos encontrados por 'name' (portal)")
-            except:
-                # Fallback a nombres antiguos
-                try:
-                    username_field = wait.until(EC.presence_of_element_located((By.NAME, 'usuario')))
-                    password_field = driver.find_element(By.NAME, 'clave')
-                    print("Campos encontrados por 'name' (pasen)")
-                except:
-                    print("No se encontraron campos por 'name'")
-            
-            # Estrategia 2: Por id
-            if not username_field:
-                try:
-                    username_field = driver.find_element(By.ID, 'USUARIO')
-                    password_field = driver.find_element(By.ID, 'CLAVE_P')
-                    print("Campos encontrados por 'id' (portal)")
-                except:
-                    try:
-                        username_field = driver.find_element(By.ID, 'usuario')
-                        password_field = driver.find_element(By.ID, 'clave')
-                        print("Campos encontrados por 'id' (pasen)")
-                    except:
-                        print("No se encontraron campos por 'id'")
-            
-            # Estrategia 3: Por tipo de input
-            if not username_field:
-                try:
-                    inputs = driver.find_elements(By.XPATH, "//input[@type='text' or @type='email']")
-                    password_inputs = driver.find_elements(By.XPATH, "//input[@type='password']")
-                    
-                    if inputs and password_inputs:
-                        username_field = inputs[0]
-                        password_field = password_inputs[0]
-                        print("Campos encontrados por tipo de input")
-                except:
-                    print("No se encontraron campos por tipo")
+            # Buscar formulario de login con múltiples estrategias (esperando a que aparezca)
+            fields = self.find_elements_by_strategies(driver, 'login_campos', LOGIN_FIELD_STRATEGIES,
+                                                      self.timeouts['login_form'])
+            username_field, password_field = fields or (None, None)
             
             if not username_field or not password_field:
-                print("No se pudieron encontrar los campos de login")
-                print("HTML de la página:")
-                print(driver.page_source[:1000])  # Primeros 1000 caracteres
+                log.warning("No se pudieron encontrar los campos de login")
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug(f"HTML de la página:\n{driver.page_source[:1000]}")
                 return False
             
             # Limpiar campos e introducir credenciales
@@ -163,460 +1810,1321 @@ class SenecaNotifier:
             username_field.send_keys(self.config['seneca']['username'])
             password_field.send_keys(self.config['seneca']['password'])
             
-            print("Credenciales introducidas")
+            log.debug("Credenciales introducidas")
             
             # Buscar botón de login con múltiples estrategias
-            login_button = None
-            
-            # Estrategia 1: Botón type="button" con value="Entrar" (portal)
-            try:
-                login_button = driver.find_element(By.XPATH, "//input[@type='button'][@value='Entrar']")
-                print("Botón encontrado: type=button value=Entrar")
-            except:
-                pass
-            
-            # Estrategia 2: Por value en cualquier tipo de botón
-            if not login_button:
-                try:
-                    login_button = driver.find_element(By.XPATH, "//input[@value='Entrar' or contains(@value, 'Acceder') or contains(@value, 'Login')]")
-                    print("Botón encontrado por value")
-                except:
-                    pass
-            
-            # Estrategia 3: Por texto del botón
-            if not login_button:
-                try:
-                    login_button = driver.find_element(By.XPATH, "//button[contains(text(), 'Entrar') or contains(text(), 'Acceder') or contains(text(), 'Login')]")
-                    print("Botón encontrado por texto")
-                except:
-                    pass
-            
-            # Estrategia 4: Primer botón submit (fallback)
-            if not login_button:
-                try:
-                    login_button = driver.find_element(By.XPATH, "//input[@type='submit']")
-                    print("Botón encontrado: primer submit")
-                except:
-                    pass
+            login_button = self.find_elements_by_strategies(driver, 'login_boton', LOGIN_BUTTON_STRATEGIES)
+            login_button = login_button[0] if login_button else None
             
             if login_button:
-                print("Haciendo clic en botón de login")
+                log.debug("Haciendo clic en botón de login")
+                login_url = driver.current_url
                 
                 # Intentar clic normal primero
                 try:
                     login_button.click()
-                    print("Clic normal exitoso")
+                    log.debug("Clic normal exitoso")
                 except Exception as e:
-                    print(f"Clic normal falló ({e}), intentando JavaScript...")
+                    log.warning(f"Clic normal falló ({e}), intentando JavaScript...")
                     try:
                         driver.execute_script("arguments[0].click();", login_button)
-                        print("Clic JavaScript exitoso")
+                        log.debug("Clic JavaScript exitoso")
                     except Exception as e2:
-                        print(f"Clic JavaScript también falló: {e2}")
+                        log.warning(f"Clic JavaScript también falló: {e2}")
                         return False
                 
-                # Esperar a que se complete el login
-                time.sleep(5)
+                # Esperar a que se complete el login: cambio de URL y documento cargado
+                try:
+                    WebDriverWait(driver, self.timeouts['login']).until(EC.url_changes(login_url))
+                    self.wait_for_page_ready(driver)
+                except TimeoutException:
+                    log.warning(f"La URL no cambió en {self.timeouts['login']}s tras el login")
                 
                 # Verificar si el login fue exitoso
                 current_url = driver.current_url
-                print(f"URL después del login: {current_url}")
+                log.debug(f"URL después del login: {current_url}")
                 
-                # Verificar diferentes indicadores de éxito
-                # Si la URL cambió y contiene "nav/" significa que el login fue exitoso
-                if (current_url != self.config['seneca']['url'] and 
-                    ("nav/" in current_url or "pasen" in current_url.lower()) and
-                    "error" not in current_url.lower()):
-                    print("Login aparentemente exitoso")
+                if self.is_login_successful(current_url):
+                    log.debug("Login aparentemente exitoso")
                     return True
                 else:
-                    print("Login falló - verificar página actual")
-                    print(f"URL original: {self.config['seneca']['url']}")
-                    print(f"URL actual: {current_url}")
+                    log.warning("Login falló - verificar página actual")
+                    log.debug(f"URL original: {self.config['seneca']['url']}")
+                    log.debug(f"URL actual: {current_url}")
                     return False
                     
             else:
-                print("No se encontró botón de login")
+                log.warning("No se encontró botón de login")
                 return False
             
         except Exception as e:
-            print(f"Error en login: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception(f"Error en login: {e}")
             return False
     
     def click_messages_pending(self, driver):
         """Hace clic en 'Mensajes pendientes'"""
         try:
-            wait = WebDriverWait(driver, 15)
-            
-            print("Buscando 'Mensajes pendientes' en la página...")
-            
-            # Primero, mostrar algunos enlaces para debug
-            try:
-                all_links = driver.find_elements(By.TAG_NAME, 'a')
-                print(f"Encontrados {len(all_links)} enlaces en la página")
-                
-                # Mostrar primeros 10 enlaces para debug
-                for i, link in enumerate(all_links[:10]):
-                    try:
-                        text = link.text.strip()
-                        href = link.get_attribute('href')
-                        if text:  # Solo mostrar enlaces con texto
-                            print(f"  Enlace {i}: '{text}' -> {href}")
-                    except:
-                        continue
-            except:
-                pass
-            
-            # Buscar el enlace "Mensajes pendientes" por diferentes métodos
-            messages_link = None
-            
-            # Intento 1: Por texto exacto
-            try:
-                messages_link = driver.find_element(By.LINK_TEXT, "Mensajes pendientes")
-                print("✓ Encontrado por texto exacto: 'Mensajes pendientes'")
-            except:
-                pass
-            
-            # Intento 2: Por texto parcial
-            if not messages_link:
-                try:
-                    messages_link = driver.find_element(By.PARTIAL_LINK_TEXT, "Mensajes")
-                    print("✓ Encontrado por texto parcial: 'Mensajes'")
-                except:
-                    pass
-            
-            # Intento 3: Por xpath más genérico (insensible a mayúsculas)
-            if not messages_link:
-                try:
-                    messages_link = driver.find_element(By.XPATH, "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'mensajes')]")
-                    print("✓ Encontrado por xpath insensible a mayúsculas")
-                except:
-                    pass
-            
-            # Intento 4: Buscar cualquier elemento que contenga "mensajes"
-            if not messages_link:
-                try:
-                    elements = driver.find_elements(By.XPATH, "//*[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'mensajes')]")
-                    if elements:
-                        messages_link = elements[0]
-                        print(f"✓ Encontrado elemento genérico con 'mensajes': {messages_link.tag_name}")
-                except:
-                    pass
+            log.debug("Buscando 'Mensajes pendientes' en la página...")
             
-            # Intento 5: Buscar por "PASEN" o "Pasen"
-            if not messages_link:
+            # Primero, mostrar algunos enlaces para debug (sólo si se van a
+            # registrar: recorrer el DOM cuesta una llamada por enlace)
+            if log.isEnabledFor(logging.DEBUG):
                 try:
-                    messages_link = driver.find_element(By.PARTIAL_LINK_TEXT, "PASEN")
-                    print("✓ Encontrado enlace con 'PASEN'")
-                except:
-                    try:
-                        messages_link = driver.find_element(By.PARTIAL_LINK_TEXT, "Pasen")
-                        print("✓ Encontrado enlace con 'Pasen'")
-                    except:
-                        pass
+                    all_links = driver.find_elements(By.TAG_NAME, 'a')
+                    log.debug(f"Encontrados {len(all_links)} enlaces en la página")
+                    
+                    # Mostrar primeros 10 enlaces para debug
+                    for i, link in enumerate(all_links[:10]):
+                        try:
+                            text = link.text.strip()
+                            href = link.get_attribute('href')
+                            if text:  # Solo mostrar enlaces con texto
+                                log.debug(f"  Enlace {i}: '{text}' -> {href}")
+                        except:
+                            continue
+                except:
+                    pass
+            
+            # Buscar el enlace "Mensajes pendientes" por diferentes métodos
+            messages_link = self.find_elements_by_strategies(driver, 'mensajes', MESSAGES_LINK_STRATEGIES)
+            messages_link = messages_link[0] if messages_link else None
             
             if messages_link:
-                print(f"Haciendo clic en: '{messages_link.text}'")
+                log.debug(f"Haciendo clic en: '{messages_link.text}'")
+                previous_url = driver.current_url
                 try:
                     messages_link.click()
-                    print("✓ Clic exitoso")
+                    log.debug("✓ Clic exitoso")
                 except Exception as e:
-                    print(f"Clic normal falló, intentando JavaScript: {e}")
+                    log.warning(f"Clic normal falló, intentando JavaScript: {e}")
                     driver.execute_script("arguments[0].click();", messages_link)
-                    print("✓ Clic JavaScript exitoso")
+                    log.debug("✓ Clic JavaScript exitoso")
                 
-                time.sleep(3)
-                print(f"Nueva URL después del clic: {driver.current_url}")
+                # Esperar a que se navegue: cambio de URL o el enlace deja de existir
+                try:
+                    WebDriverWait(driver, self.timeouts['messages']).until(
+                        EC.any_of(EC.url_changes(previous_url), EC.staleness_of(messages_link)))
+                    self.wait_for_page_ready(driver)
+                except TimeoutException:
+                    log.warning(f"La página no cambió en {self.timeouts['messages']}s tras el clic")
+                
+                log.debug(f"Nueva URL después del clic: {driver.current_url}")
                 return True
             else:
-                print("✗ No se pudo encontrar el enlace 'Mensajes pendientes'")
-                print("\nTodos los enlaces disponibles:")
-                try:
-                    all_links = driver.find_elements(By.TAG_NAME, 'a')
-                    for i, link in enumerate(all_links):
-                        try:
-                            text = link.text.strip()
-                            if text:
-                                print(f"  {i}: '{text}'")
-                        except:
-                            continue
-                except:
-                    pass
+                log.warning("✗ No se pudo encontrar el enlace 'Mensajes pendientes'")
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Todos los enlaces disponibles:")
+                    try:
+                        all_links = driver.find_elements(By.TAG_NAME, 'a')
+                        for i, link in enumerate(all_links):
+                            try:
+                                text = link.text.strip()
+                                if text:
+                                    log.debug(f"  {i}: '{text}'")
+                            except:
+                                continue
+                    except:
+                        pass
                 return False
                 
         except Exception as e:
-            print(f"Error al hacer clic en mensajes pendientes: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception(f"Error al hacer clic en mensajes pendientes: {e}")
+            return False
+    
+    def build_news_item(self, cells, link=None):
+        """Construye una noticia a partir de los textos de las celdas de una fila"""
+        if not cells:
+            return None
+        
+        # Extraer información de las celdas específicas según la estructura conocida
+        title = ""
+        date_info = ""
+        sender = ""
+        read_date = ""
+        
+        # Verificar que tenemos suficientes celdas
+        if len(cells) >= 8:
+            # Celda 1: Fecha de entrada
+            date_info = cells[1]
+            
+            # Celda 5: Asunto (TÍTULO de la noticia)
+            title = cells[5]
+            
+            # Celda 6: Remitido por
+            sender = cells[6]
+            
+            # Celda 7: Fecha de lectura
+            read_date = cells[7]
+        
+        # Si no encontramos título en celda 5, buscar en otras celdas
+        if not title:
+            for cell_text in cells:
+                if cell_text and len(cell_text) > 5 and not cell_text.startswith('0') and '/' not in cell_text:
+                    title = cell_text
+                    break
+        
+        # Construir contenido informativo
+        content_parts = []
+        if date_info:
+            content_parts.append(f"📅 Fecha: {date_info}")
+        if sender:
+            content_parts.append(f"👤 Remitido por: {sender}")
+        if read_date:
+            content_parts.append(f"👀 Leído: {read_date}")
+        else:
+            content_parts.append("📢 Mensaje nuevo")
+        
+        content = "\n".join(content_parts)
+        
+        # Verificar que tenemos contenido válido
+        if not title or len(title) <= 3:
+            return None
+        
+        log.debug(f"Noticia extraída: '{title[:50]}...'")
+        return {
+            'hash': self.generate_news_id(date_info, sender, title),
+            # Identificador de versiones anteriores, para no reenviar lo ya notificado
+            'legacy_hash': self.generate_news_hash(title, content),
+            'title': title,
+            'content': content,
+            'timestamp': datetime.now().isoformat(),
+            'date_info': date_info,
+            'sender': sender,
+            'link': link if link and not link.lower().startswith('javascript:') else None
+        }
+    
+    def news_from_rows(self, rows, links=None):
+        """Convierte las filas de la tabla de noticias (listas de textos) en noticias"""
+        news_list = []
+        log.debug(f"Encontradas {len(rows)} filas en la tabla de noticias")
+        
+        # Saltar la primera fila si es header
+        start_row = 1 if len(rows) > 1 else 0
+        
+        # En modo incremental la tabla se recorre de la más nueva a la más antigua
+        # y se para en la primera noticia ya conocida
+        high_water_mark = self.state.get('high_water_mark') if self.incremental else None
+        self.reached_known = False
+        
+        for i, cells in enumerate(rows[start_row:], start_row):
+            try:
+                # El filtro de fecha se aplica antes de construir la noticia y calcular su hash
+                if self.is_row_before_filter(cells):
+                    if self.incremental:
+                        log.debug(f"Fila {i} anterior al filtro de fecha, se detiene la extracción")
+                        self.reached_known = True
+                        break
+                    continue
+                news_item = self.build_news_item(cells, links[i] if links else None)
+                if not news_item:
+                    continue
+                if self.incremental and (news_item['hash'] == high_water_mark or self.is_known(news_item)):
+                    log.debug(f"Fila {i} ya conocida, se detiene la extracción")
+                    self.reached_known = True
+                    break
+                news_list.append(news_item)
+            except Exception as e:
+                log.warning(f"Error procesando fila {i}: {e}")
+                continue
+        
+        return news_list
+    
+    def news_from_row_texts(self, texts):
+        """Fallback: construye noticias a partir del texto completo de cada fila"""
+        news_list = []
+        
+        for text in texts:
+            if text and len(text) > 10:
+                # Usar primeras palabras como título
+                words = text.split()
+                title = " ".join(words[:6]) if len(words) >= 6 else text
+                
+                news_list.append({
+                    'hash': self.generate_news_hash(title, text),
+                    'title': title,
+                    'content': text,
+                    'timestamp': datetime.now().isoformat(),
+                    'date_info': ''
+                })
+        
+        return news_list
+    
+    def read_news_table(self, driver):
+        """Lee la tabla de noticias celda a celda. Devuelve (nº de tablas, filas o None, enlaces)"""
+        # Esperar a que aparezca la tabla de noticias (la segunda tabla de la página)
+        def news_tables(d):
+            found = d.find_elements(By.TAG_NAME, 'table')
+            return found if len(found) > 1 else False
+        
+        try:
+            tables = WebDriverWait(driver, self.timeouts['table']).until(news_tables)
+        except TimeoutException:
+            return len(driver.find_elements(By.TAG_NAME, 'table')), None, None
+        
+        # Usar la Tabla 1 (índice 1) que contiene las noticias
+        rows = []
+        links = []
+        for row in tables[1].find_elements(By.TAG_NAME, 'tr'):
+            try:
+                rows.append([cell.text.strip() for cell in row.find_elements(By.TAG_NAME, 'td')])
+                # De la más nueva a la más antigua: no hace falta leer las filas anteriores al filtro
+                if self.incremental and self.is_row_before_filter(rows[-1]):
+                    links.append(None)
+                    break
+                # Los enlaces solo hacen falta para descargar el texto completo
+                anchors = row.find_elements(By.TAG_NAME, 'a') if self.fetch_bodies else []
+                links.append(anchors[0].get_attribute('href') if anchors else None)
+            except Exception as e:
+                log.warning(f"Error leyendo fila: {e}")
+                rows.append([])
+                links.append(None)
+        
+        return len(tables), rows, links
+    
+    def read_news_table_bulk(self, driver):
+        """Lee la tabla de noticias completa con una sola llamada a JavaScript"""
+        try:
+            result = WebDriverWait(driver, self.timeouts['table']).until(
+                lambda d: d.execute_script(TABLE_ROWS_SCRIPT))
+        except TimeoutException:
+            return len(driver.find_elements(By.TAG_NAME, 'table')), None, None
+        except WebDriverException as e:
+            log.warning(f"Extracción en bloque falló ({e}), leyendo celda a celda...")
+            return self.read_news_table(driver)
+        
+        return result['tables'], result['rows'], result['links']
+    
+    def read_table_fingerprint(self, driver):
+        """Huella de la tabla de noticias con una sola llamada a JavaScript (None si no aparece)"""
+        try:
+            return WebDriverWait(driver, self.timeouts['table']).until(
+                lambda d: d.execute_script(TABLE_FINGERPRINT_SCRIPT))
+        except (TimeoutException, WebDriverException):
+            return None
+    
+    def fingerprint_key(self, fingerprint):
+        """Lo que debe coincidir para saltarse la extracción: la huella de la tabla, el motor que la
+        calculó, el filtro de fecha y el tamaño del registro (por si se ha borrado o depurado)"""
+        return f"{self.engine_name}|{fingerprint}|{self.date_filter or ''}|{len(self.processed_news)}"
+    
+    def iter_news_pages(self, driver):
+        """Genera las noticias de cada página de mensajes, siguiendo los enlaces de página siguiente"""
+        yield self.extract_news(driver)
+        
+        for page_number in range(2, self.max_pages + 1):
+            if not self.open_next_page(driver):
+                return
+            log.debug(f"Página {page_number} de mensajes")
+            yield self.extract_news(driver)
+    
+    def open_next_page(self, driver):
+        """Pulsa el enlace de página siguiente, si existe, y espera a que cambie la tabla"""
+        conditions = ' or '.join(f"normalize-space(.)='{text}'" for text in self.next_page_texts)
+        links = driver.find_elements(By.XPATH, f"//a[{conditions}]")
+        if not links:
             return False
+        
+        tables = driver.find_elements(By.TAG_NAME, 'table')
+        previous_url = driver.current_url
+        try:
+            links[0].click()
+        except WebDriverException:
+            driver.execute_script("arguments[0].click();", links[0])
+        
+        # Esperar a que se navegue o a que se sustituya la tabla de noticias
+        try:
+            changed = [EC.url_changes(previous_url)]
+            if len(tables) > 1:
+                changed.append(EC.staleness_of(tables[1]))
+            WebDriverWait(driver, self.timeouts['messages']).until(EC.any_of(*changed))
+            self.wait_for_page_ready(driver)
+        except TimeoutException:
+            log.warning("La página siguiente no cargó")
+            return False
+        return True
     
     def extract_news(self, driver):
         """Extrae las noticias de la página"""
         news_list = []
         
         try:
-            # Esperar a que cargue la página de mensajes
-            wait = WebDriverWait(driver, 10)
-            time.sleep(2)  # Tiempo adicional para asegurar carga completa
+            log.debug("Buscando tabla de noticias...")
             
-            print("Buscando tabla de noticias...")
-            
-            # Buscar todas las tablas
-            tables = driver.find_elements(By.TAG_NAME, 'table')
-            print(f"Encontradas {len(tables)} tablas")
+            if self.extraction == 'bulk':
+                table_count, rows, links = self.read_news_table_bulk(driver)
+            else:
+                table_count, rows, links = self.read_news_table(driver)
+            log.debug(f"Encontradas {table_count} tablas")
             
-            if len(tables) > 1:
-                # Usar la Tabla 1 (índice 1) que contiene las noticias
-                news_table = tables[1]
-                print("Usando Tabla 1 para extraer noticias")
-                
-                # Buscar todas las filas de la tabla
-                rows = news_table.find_elements(By.TAG_NAME, 'tr')
-                print(f"Encontradas {len(rows)} filas en la tabla de noticias")
-                
-                # Saltar la primera fila si es header
-                start_row = 1 if len(rows) > 1 else 0
-                
-                for i, row in enumerate(rows[start_row:], start_row):
-                    try:
-                        cells = row.find_elements(By.TAG_NAME, 'td')
-                        if not cells:
-                            continue
-                        
-                        # Extraer información de las celdas específicas según la estructura conocida
-                        title = ""
-                        content = ""
-                        date_info = ""
-                        sender = ""
-                        read_date = ""
-                        
-                        # Verificar que tenemos suficientes celdas
-                        if len(cells) >= 8:
-                            # Celda 1: Fecha de entrada
-                            date_info = cells[1].text.strip() if len(cells) > 1 else ""
-                            
-                            # Celda 5: Asunto (TÍTULO de la noticia)
-                            title = cells[5].text.strip() if len(cells) > 5 else ""
-                            
-                            # Celda 6: Remitido por
-                            sender = cells[6].text.strip() if len(cells) > 6 else ""
-                            
-                            # Celda 7: Fecha de lectura
-                            read_date = cells[7].text.strip() if len(cells) > 7 else ""
-                        
-                        # Si no encontramos título en celda 5, buscar en otras celdas
-                        if not title:
-                            for cell in cells:
-                                cell_text = cell.text.strip()
-                                if cell_text and len(cell_text) > 5 and not cell_text.startswith('0') and '/' not in cell_text:
-                                    title = cell_text
-                                    break
-                        
-                        # Construir contenido informativo
-                        content_parts = []
-                        if date_info:
-                            content_parts.append(f"📅 Fecha: {date_info}")
-                        if sender:
-                            content_parts.append(f"👤 Remitido por: {sender}")
-                        if read_date:
-                            content_parts.append(f"👀 Leído: {read_date}")
-                        else:
-                            content_parts.append("📢 Mensaje nuevo")
-                        
-                        content = "\n".join(content_parts)
-                        
-                        # Verificar que tenemos contenido válido
-                        if title and len(title) > 3:
-                            news_hash = self.generate_news_hash(title, content)
-                            
-                            news_item = {
-                                'hash': news_hash,
-                                'title': title,
-                                'content': content,
-                                'timestamp': datetime.now().isoformat(),
-                                'date_info': date_info
-                            }
-                            
-                            news_list.append(news_item)
-                            print(f"Noticia extraída: '{title[:50]}...'")
-                            
-                    except Exception as e:
-                        print(f"Error procesando fila {i}: {e}")
-                        continue
+            if rows is not None:
+                log.debug("Usando Tabla 1 para extraer noticias")
+                news_list = self.news_from_rows(rows, links)
             
             else:
-                print("No se encontró la tabla de noticias esperada")
+                log.warning("No se encontró la tabla de noticias esperada")
                 # Fallback a método anterior
-                news_elements = driver.find_elements(By.XPATH, "//tr[td]")
-                
-                for element in news_elements:
+                texts = []
+                for element in driver.find_elements(By.XPATH, "//tr[td]"):
                     try:
-                        text = element.text.strip()
-                        if text and len(text) > 10:
-                            # Usar primeras palabras como título
-                            words = text.split()
-                            title = " ".join(words[:6]) if len(words) >= 6 else text
-                            
-                            news_hash = self.generate_news_hash(title, text)
-                            
-                            news_item = {
-                                'hash': news_hash,
-                                'title': title,
-                                'content': text,
-                                'timestamp': datetime.now().isoformat(),
-                                'date_info': ''
-                            }
-                            
-                            news_list.append(news_item)
-                            
-                    except Exception as e:
+                        texts.append(element.text.strip())
+                    except Exception:
                         continue
+                
+                news_list = self.news_from_row_texts(texts)
             
-            print(f"Total de noticias extraídas: {len(news_list)}")
+            log.debug(f"Total de noticias extraídas: {len(news_list)}")
             
         except Exception as e:
-            print(f"Error extrayendo noticias: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception(f"Error extrayendo noticias: {e}")
         
         return news_list
     
+    def telegram_targets(self):
+        """Destinos de las notificaciones: el chat principal (todo) y los de "routes" (según sus reglas)"""
+        telegram = self.config['telegram']
+        targets = [{'chat_id': telegram['chat_id']}] if telegram.get('chat_id') else []
+        for route in telegram.get('routes', []):
+            if 'chat_id' not in route:
+                raise ValueError(f"Regla de envío sin chat_id: {route}")
+            targets.append(route)
+        if not targets:
+            raise ValueError("No hay destinos de Telegram: configura telegram.chat_id o telegram.routes")
+        return targets
+    
+    def target_key(self, target):
+        """Identifica un destino: chat y, en grupos con temas, el tema"""
+        thread_id = target.get('thread_id')
+        return f"{target['chat_id']}#{thread_id}" if thread_id else str(target['chat_id'])
+    
+    def target_matches(self, target, news):
+        """Comprueba las reglas de un destino: algún texto de "sender" en el remitente y de "subject"
+        en el asunto (sin distinguir mayúsculas). Un campo sin reglas acepta cualquier valor"""
+        for field, value in (('sender', news.get('sender', '')), ('subject', news['title'])):
+            patterns = target.get(field)
+            if not patterns:
+                continue
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            if not any(pattern.lower() in value.lower() for pattern in patterns):
+                return False
+        return True
+    
     def send_telegram_message(self, message):
         """Envía un mensaje por Telegram"""
+        target = self.targets[0]
+        return self.telegram.send(target['chat_id'], message, target.get('thread_id'))
+    
+    def fetch_news_bodies(self, news_items):
+        """Añade a las noticias nuevas su texto completo y adjuntos, descargándolos en paralelo"""
+        to_fetch = []
+        for news in news_items:
+            if not news.get('link'):
+                continue
+            cached = self.load_cached_body(news['hash'])
+            if cached:
+                news.update(cached)
+            else:
+                to_fetch.append(news)
+        
+        if not to_fetch:
+            return
+        
+        log.info(f"Descargando el texto de {len(to_fetch)} mensajes...")
+        workers = min(self.config.get('detail_workers', 4), len(to_fetch))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='detalle') as pool:
+            for news, detail in zip(to_fetch, pool.map(self.fetch_news_detail, to_fetch)):
+                if detail:
+                    news.update(detail)
+                    try:
+                        self.save_cached_body(news['hash'], detail)
+                    except OSError as e:
+                        # Es solo una caché: el mensaje se envía igual
+                        log.warning(f"No se pudo guardar el texto del mensaje en {self.body_cache_dir}: {e}")
+    
+    def fetch_news_detail(self, news):
+        """Descarga la página de un mensaje con una sesión HTTP propia (una por hilo)"""
+        session = import_requests().Session()
+        session.headers['User-Agent'] = USER_AGENT
+        for cookie in self.detail_cookies:
+            session.cookies.set(cookie['name'], cookie['value'],
+                                domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
         try:
-            url = f"https://api.telegram.org/bot{self.config['telegram']['bot_token']}/sendMessage"
-            
-            data = {
-                'chat_id': self.config['telegram']['chat_id'],
-                'text': message,
-                'parse_mode': 'HTML'
-            }
-            
-            response = requests.post(url, data=data)
-            return response.status_code == 200
-            
+            response = session.get(news['link'], timeout=self.config.get('http_timeout', 30))
+            response.raise_for_status()
+            page = parse_html(response.text)
+            attachments = [{'name': text or href.rsplit('/', 1)[-1], 'url': urljoin(response.url, href)}
+                           for text, href in page.link_texts()
+                           if href and ATTACHMENT_PATTERN.search(href)]
+            return {'body': page.text(), 'attachments': attachments}
         except Exception as e:
-            print(f"Error enviando mensaje por Telegram: {e}")
-            return False
+            # Un fallo en un mensaje no impide enviar los demás ni este (con el resumen)
+            log.warning(f"Error descargando el mensaje '{news['title'][:50]}': {e}")
+            return None
+        finally:
+            session.close()
+    
+    def load_cached_body(self, news_id):
+        path = os.path.join(self.body_cache_dir, f"{news_id}.json")
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+        return None
+    
+    def save_cached_body(self, news_id, detail):
+        os.makedirs(self.body_cache_dir, exist_ok=True)
+        write_json_atomic(os.path.join(self.body_cache_dir, f"{news_id}.json"), detail, indent=None)
+    
+    def format_news_message(self, news):
+        """Formatea una noticia como mensaje de Telegram"""
+        message = f"📢 <b>Nueva noticia en Séneca</b>\n\n"
+        message += f"<b>{news['title']}</b>\n\n"
+        message += f"{news['content'][:500]}"
+        if len(news['content']) > 500:
+            message += "..."
+        
+        if news.get('body'):
+            body = news['body'][:3000]
+            message += f"\n\n{escape(body)}"
+            if len(news['body']) > 3000:
+                message += "..."
+        for attachment in news.get('attachments', []):
+            message += f"\n📎 <a href=\"{escape(attachment['url'])}\">{escape(attachment['name'])}</a>"
+        
+        message += f"\n\n🕐 {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+        return message
+    
+    def format_digest_messages(self, news_items):
+        """Agrupa muchas noticias en resúmenes que caben en mensajes de Telegram.
+        Devuelve pares (mensaje, noticias incluidas)"""
+        header = f"📢 <b>{len(news_items)} noticias nuevas en Séneca</b>\n"
+        footer = f"\n🕐 {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+        
+        digests = []
+        message, included = header, []
+        for news in news_items:
+            entry = f"\n<b>{news['title']}</b>\n{news['content'][:200]}\n"
+            if included and len(message) + len(entry) + len(footer) > TelegramSender.MAX_LENGTH:
+                digests.append((message + footer, included))
+                message, included = header, []
+            message += entry
+            included.append(news)
+        if included:
+            digests.append((message + footer, included))
+        return digests
+    
+    def parse_news_date(self, date_str):
+        """Convierte la fecha de una fila probando primero el formato que encajó la última vez"""
+        date_str = date_str.strip()
+        for i, fmt in enumerate(self.date_formats):
+            try:
+                news_date = datetime.strptime(date_str, fmt).date()
+            except ValueError:
+                continue
+            if i:
+                self.date_formats.insert(0, self.date_formats.pop(i))
+            return news_date
+        return None
     
     def is_date_newer_than_filter(self, date_str):
         """Verifica si una fecha es más reciente que el filtro"""
-        if not self.date_filter or not date_str:
+        if not self.filter_date or not date_str:
             return True
-            
-        try:
-            # Intentar parsear diferentes formatos de fecha del sistema
-            date_formats = [
-                '%d/%m/%Y',  # 12/03/2024
-                '%d/%m/%y',  # 12/03/24
-                '%Y-%m-%d',  # 2024-03-12
-                '%d-%m-%Y',  # 12-03-2024
-            ]
-            
-            news_date = None
-            for fmt in date_formats:
-                try:
-                    news_date = datetime.strptime(date_str.strip(), fmt)
-                    break
-                except ValueError:
-                    continue
-            
-            if not news_date:
-                # Si no se puede parsear la fecha, asumir que es reciente
-                return True
-                
-            # Convertir filtro YYYYMMDD a datetime
-            filter_date = datetime.strptime(self.date_filter, '%Y%m%d')
-            
-            return news_date.date() > filter_date.date()
-            
-        except Exception as e:
-            print(f"Error comparando fechas: {e}")
-            return True  # En caso de error, incluir la noticia
+        
+        news_date = self.parse_news_date(date_str)
+        # Si no se puede parsear la fecha, asumir que es reciente
+        return news_date is None or news_date > self.filter_date
     
-    def process_new_news(self, news_list):
-        """Procesa las noticias nuevas y envía por Telegram"""
-        new_news_count = 0
+    def is_row_before_filter(self, cells):
+        """Indica si una fila de la tabla es anterior al filtro de fecha (celda 1: fecha de entrada)"""
+        return bool(self.filter_date) and len(cells) >= 8 and not self.is_date_newer_than_filter(cells[1])
+    
+    def select_new_news(self, news_list):
+        """Devuelve las noticias que no se han procesado todavía y pasan el filtro de fecha"""
+        new_news = []
         
         for news in news_list:
-            if news['hash'] not in self.processed_news:
+            if not self.is_known(news):
                 # Verificar filtro de fecha si está configurado
                 if not self.is_date_newer_than_filter(news.get('date_info', '')):
-                    print(f"Noticia filtrada por fecha: {news['title'][:50]}...")
+                    log.debug(f"Noticia filtrada por fecha: {news['title'][:50]}...")
                     continue
                     
                 # Nueva noticia encontrada
-                self.processed_news[news['hash']] = {
-                    'title': news['title'],
-                    'processed_at': datetime.now().isoformat()
-                }
-                
-                # Formatear mensaje para Telegram
-                message = f"📢 <b>Nueva noticia en Séneca</b>\n\n"
-                message += f"<b>{news['title']}</b>\n\n"
-                message += f"{news['content'][:500]}"
-                if len(news['content']) > 500:
-                    message += "..."
-                
-                message += f"\n\n🕐 {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-                
-                # Enviar por Telegram
-                if self.send_telegram_message(message):
-                    print(f"Noticia enviada: {news['title'][:50]}...")
-                    new_news_count += 1
-                else:
-                    print(f"Error enviando noticia: {news['title'][:50]}...")
+                new_news.append(news)
+        
+        return new_news
+    
+    def process_new_news(self, news_list):
+        """Pasa las noticias nuevas a la bandeja de salida. Devuelve cuántas se encolaron"""
+        return self.enqueue_news(self.select_new_news(news_list))
+    
+    def enqueue_news(self, new_news):
+        """Marca como procesadas las noticias nuevas y deja sus mensajes en la bandeja de salida"""
+        if not new_news:
+            self.processed_news.commit()
+            return 0
+        
+        # Sin el texto completo la noticia se envía igualmente con el resumen de la tabla
+        if self.fetch_bodies:
+            with self.timed_step('detalle'):
+                try:
+                    self.fetch_news_bodies(new_news)
+                except Exception as e:
+                    log.warning(f"Error descargando el texto de los mensajes, se envía solo el resumen: {e}")
+        
+        # Cada noticia va a los destinos cuyas reglas cumple, una sola vez por destino
+        by_target = {}
+        for news in new_news:
+            targets = {self.target_key(target): target for target in self.targets
+                       if self.target_matches(target, news)}
+            if not targets:
+                log.debug(f"Ningún destino para la noticia: {news['title'][:50]}...")
+            for key, target in targets.items():
+                by_target.setdefault(key, (target, []))[1].append(news)
+        
+        # Con muchas noticias a la vez se envían resúmenes en lugar de un mensaje por noticia.
+        # El mensaje de cada noticia se formatea una vez y se reutiliza en todos los destinos.
+        digest_threshold = self.config['telegram'].get('digest_threshold', 0)
+        rendered = {}
+        for key, (target, items) in by_target.items():
+            if digest_threshold and len(items) > digest_threshold:
+                messages = self.format_digest_messages(items)
+            else:
+                messages = []
+                for news in items:
+                    if news['hash'] not in rendered:
+                        rendered[news['hash']] = self.format_news_message(news)
+                    messages.append((rendered[news['hash']], [news]))
+            
+            for message, included in messages:
+                hashes = [news['hash'] for news in included]
+                # El identificador incluye el destino: la misma noticia es un mensaje distinto en cada chat
+                message_id = self.generate_news_hash(key + ''.join(hashes))
+                self.outbox.add(message_id, target['chat_id'], message, hashes, target.get('thread_id'))
+        
+        # Se marcan como procesadas cuando sus mensajes ya están en la bandeja: si algo falla
+        # antes, la próxima consulta las vuelve a encontrar
+        for news in new_news:
+            self.processed_news.add(news['hash'], news['title'], datetime.now().isoformat(), news.get('sender', ''))
         
-        # Guardar las noticias procesadas
-        if new_news_count > 0:
+        # La bandeja se guarda antes que las noticias procesadas: si el proceso se
+        # interrumpe entre ambas escrituras, la noticia se vuelve a encolar sin duplicarse
+        with self.timed_step('almacen'):
+            self.outbox.save()
             self.save_processed_news()
         
-        return new_news_count
+        return len(new_news)
     
-    def run(self):
-        """Ejecuta el proceso completo"""
-        driver = None
+    def deliver_outbox(self):
+        """Envía los mensajes pendientes de la bandeja. Devuelve cuántas noticias se entregaron.
         
-        try:
-            print(f"[{datetime.now()}] Iniciando proceso...")
+        Cada chat (o tema) se atiende en su propio hilo para no esperar a los demás, respetando
+        el orden de sus mensajes; TelegramSender reparte los turnos entre todos.
+        """
+        by_chat = {}
+        for message_id, message in self.outbox.pending():
+            by_chat.setdefault((message['chat_id'], message.get('thread_id')), []).append((message_id, message))
+        
+        delivered = 0
+        if by_chat:
+            workers = min(self.config['telegram'].get('send_workers', 4), len(by_chat))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='envio') as pool:
+                delivered = sum(pool.map(self.deliver_chat, by_chat.values()))
+        
+        with self.outbox.lock:
+            self.outbox.prune()
+            self.outbox.save()
+        return delivered
+    
+    def deliver_chat(self, messages):
+        """Envía en orden los mensajes pendientes de un chat. Devuelve cuántas noticias se entregaron.
+        
+        Se para en el primer envío fallido: los mensajes siguientes quedan pendientes detrás de él
+        para que el chat no los reciba desordenados.
+        """
+        _log_context.account = self.account
+        delivered = 0
+        
+        for message_id, message in messages:
+            # Enviar por Telegram
+            start = time.perf_counter()
+            sent = self.telegram.send(message['chat_id'], message['text'], message.get('thread_id'))
+            elapsed = time.perf_counter() - start
+            with self.outbox.lock:
+                self.send_latencies.append(elapsed)
+                if sent:
+                    self.outbox.mark_sent(message_id)
+                    delivered += len(message['news'])
+                    self.counters['enviadas'] += len(message['news'])
+                    log.debug(f"Mensaje enviado ({len(message['news'])} noticias)")
+                else:
+                    self.outbox.mark_failed(message_id)
+                    self.counters['fallidas'] += len(message['news'])
+                    if message['status'] == Outbox.FAILED:
+                        log.error(f"Mensaje descartado tras {message['attempts']} intentos")
+                    else:
+                        log.warning(f"Error enviando mensaje, se reintentará (intento {message['attempts']})")
+                # Guardar tras cada envío para no repetirlo si el proceso se interrumpe
+                self.outbox.save()
+            if not sent:
+                break
+        return delivered
+    
+    def engine_chain(self):
+        """Devuelve los motores a probar en orden según la configuración"""
+        if self.engine == 'auto':
+            return [HttpEngine, SeleniumEngine]
+        return [HttpEngine] if self.engine == 'http' else [SeleniumEngine]
+    
+    def collect_new_news(self, pages):
+        """Recorre las páginas de noticias a medida que se extraen y acumula solo las nuevas"""
+        new_news = []
+        seen = set()
+        extracted = 0
+        
+        for page_number, page in enumerate(pages, 1):
+            # La noticia más reciente marca dónde parar en la próxima consulta incremental.
+            # Se guarda en run() cuando las noticias ya están registradas: si falla una página
+            # posterior o el envío a la bandeja, la próxima consulta vuelve a leerlas
+            if page_number == 1 and page:
+                self.newest_hash = page[0]['hash']
+            
+            extracted += len(page)
+            fresh = [news for news in self.select_new_news(page) if news['hash'] not in seen]
+            seen.update(news['hash'] for news in fresh)
+            new_news.extend(fresh)
             
-            # Inicializar driver
-            driver = self.init_driver()
+            # Con la tabla ordenada de más nueva a más antigua (modo incremental),
+            # una página sin novedades implica que las siguientes tampoco las tienen
+            if self.incremental and (not fresh or self.reached_known):
+                log.debug(f"Página {page_number} sin noticias nuevas, no se siguen más páginas")
+                pages.close()
+                break
+        
+        self.counters['extraidas'] += extracted
+        self.counters['nuevas'] += len(new_news)
+        log.info(f"Extraídas {extracted} noticias ({len(new_news)} nuevas)")
+        return new_news
+    
+    def scrape_news(self, engine_class):
+        """Login, navegación y extracción con un motor. Devuelve las noticias nuevas o None si falla"""
+        # En modo demonio se reutiliza el motor (navegador o sesión HTTP) de la consulta anterior
+        engine = self.engines.pop(engine_class.name, None)
+        success = False
+        try:
+            if engine is None:
+                engine = engine_class(self)
+                with self.timed_step('inicio'):
+                    engine.start()
             
             # Login en Séneca
-            if not self.login_to_seneca(driver):
-                print("Error en el login")
-                return
+            with self.timed_step('login'):
+                logged_in = engine.login()
+            if not logged_in:
+                log.warning("Error en el login")
+                return None
             
-            print("Login exitoso")
+            log.info("Login exitoso")
             
             # Hacer clic en "Mensajes pendientes"
-            if not self.click_messages_pending(driver):
-                print("Error accediendo a mensajes pendientes")
-                return
+            with self.timed_step('navegacion'):
+                opened = engine.open_messages()
+            if not opened:
+                log.warning("Error accediendo a mensajes pendientes")
+                return None
+            
+            log.info("Accedido a mensajes pendientes")
+            
+            # Extraer noticias página a página, quedándonos solo con las nuevas. Si la tabla
+            # es idéntica a la de la consulta anterior no hay nada nuevo que buscar en ella
+            # (con varias páginas solo se puede saber en modo incremental)
+            with self.timed_step('extraccion'):
+                self.engine_name = engine.name
+                if self.skip_unchanged and (self.max_pages == 1 or self.incremental):
+                    self.table_fingerprint = engine.fingerprint()
+                if (self.table_fingerprint and
+                        self.fingerprint_key(self.table_fingerprint) == self.state.get('table_fingerprint')):
+                    log.info("La tabla de mensajes no ha cambiado desde la última consulta")
+                    self.counters['tabla_sin_cambios'] += 1
+                    self.table_unchanged = True
+                    new_news = []
+                else:
+                    if self.table_fingerprint:
+                        self.counters['tabla_con_cambios'] += 1
+                    new_news = self.collect_new_news(engine.iter_news_pages())
+            # La sesión sirve después para descargar el texto de los mensajes nuevos
+            if self.fetch_bodies:
+                self.detail_cookies = engine.cookies()
+            success = True
+            return new_news
+            
+        finally:
+            # Los navegadores de la reserva vuelven a ella: otras cuentas pueden estar esperando
+            if success and self.keep_engines and not getattr(engine, 'driver_pool', None):
+                self.engines[engine_class.name] = engine
+            elif engine:
+                with self.timed_step('cierre'):
+                    engine.quit()
+    
+    def close(self):
+        """Cierra los motores que se mantienen abiertos entre consultas y la sesión de Telegram"""
+        for engine in self.engines.values():
+            try:
+                engine.quit()
+            except Exception as e:
+                log.warning(f"Error cerrando el motor '{engine.name}': {e}")
+        self.engines = {}
+        self.telegram.close()
+        self.processed_news.close()
+        self.run_lock.release()
+    
+    def run(self):
+        """Ejecuta el proceso completo. Devuelve True si la consulta se completó"""
+        self.timings = {}
+        self.counters = dict.fromkeys(RUN_COUNTERS + FINGERPRINT_COUNTERS, 0)
+        self.send_latencies = []
+        self.table_fingerprint = None
+        self.table_unchanged = False
+        self.newest_hash = None
+        _log_context.account = self.account
+        
+        # Si otra ejecución sigue con esta cuenta no se abre un segundo navegador
+        if not self.acquire_run_lock():
+            log.warning(f"Otra ejecución está usando esta cuenta ({self.run_lock.path}); se omite la consulta")
+            _log_context.account = None
+            return False
+        
+        try:
+            log.info("Iniciando proceso...")
             
-            print("Accedido a mensajes pendientes")
+            new_news = None
+            for engine_class in self.engine_chain():
+                log.info(f"Usando motor '{engine_class.name}'")
+                try:
+                    new_news = self.scrape_news(engine_class)
+                except Exception as e:
+                    log.warning(f"Error con el motor '{engine_class.name}': {e}")
+                if new_news is not None:
+                    break
             
-            # Extraer noticias
-            news_list = self.extract_news(driver)
-            print(f"Extraídas {len(news_list)} noticias")
+            if new_news is not None and not self.table_unchanged:
+                # Pasar las noticias nuevas a la bandeja de salida
+                queued = self.enqueue_news(new_news)
+                if queued == 0:
+                    log.info("No hay noticias nuevas")
+                # La huella y la marca incremental se guardan cuando las noticias ya están registradas
+                if self.table_fingerprint:
+                    self.state.set('table_fingerprint', self.fingerprint_key(self.table_fingerprint))
+                if self.newest_hash:
+                    self.state.set('high_water_mark', self.newest_hash)
             
-            # Procesar noticias nuevas
-            new_count = self.process_new_news(news_list)
+            # Enviar lo pendiente, incluidos los reintentos de consultas anteriores
+            self.flush_outbox()
             
-            if new_count > 0:
-                print(f"Se enviaron {new_count} noticias nuevas")
-            else:
-                print("No hay noticias nuevas")
+            return new_news is not None
                 
         except Exception as e:
-            print(f"Error general: {e}")
+            log.exception(f"Error general: {e}")
+            return False
             
         finally:
-            if driver:
-                driver.quit()
+            self.print_timings()
+            self.print_counters()
+            # El demonio mantiene el cerrojo entre consultas: su registro en memoria es el bueno
+            if not self.keep_lock:
+                self.run_lock.release()
+            _log_context.account = None
+    
+    def flush_outbox(self):
+        """Entrega los mensajes pendientes de la bandeja de salida"""
+        with self.timed_step('envio'):
+            delivered = self.deliver_outbox()
+        if delivered > 0:
+            log.info(f"Se enviaron {delivered} noticias nuevas")
+        return delivered
+    
+    def next_poll_delay(self, failures):
+        """Segundos hasta la siguiente consulta, con variación aleatoria y espera creciente tras fallos"""
+        now = datetime.now()
+        delay = None
+        if self.daemon['adaptive']:
+            if self.schedule is None:
+                self.schedule = PollSchedule(self.processed_news, self.daemon['min_interval'],
+                                             self.daemon['max_interval'], self.daemon['learning_weeks'])
+            delay = self.schedule.next_delay(now)
+        if delay is None:
+            delay = self.daemon['interval']
+        if failures:
+            delay = min(delay * 2 ** min(failures, 10), self.daemon['max_backoff'])
+        delay += random.uniform(-self.daemon['jitter'], self.daemon['jitter'])
+        
+        # En las horas de silencio no se consulta: se espera a que terminen
+        quiet_end = quiet_hours_end(now + timedelta(seconds=delay), self.quiet_hours)
+        if quiet_end:
+            delay = (quiet_end - now).total_seconds() + random.uniform(0, self.daemon['jitter'])
+        return max(delay, 1)
+
+
+class MetricsRegistry:
+    """Métricas acumuladas por cuenta en modo demonio, en JSON y en formato de texto de Prometheus"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.accounts = {}
+
+    def record(self, notifier, ok):
+        """Acumula el resultado, los contadores y los tiempos de la última consulta de una cuenta"""
+        with self.lock:
+            metrics = self.accounts.setdefault(notifier.account or 'default', {
+                'consultas': 0,
+                'consultas_fallidas': 0,
+                'ultima_consulta': None,
+                'contadores': dict.fromkeys(RUN_COUNTERS + FINGERPRINT_COUNTERS, 0),
+                'segundos_por_paso': {},
+                'envio_latencia': {'total': 0.0, 'cantidad': 0, 'maxima': 0.0},
+            })
+            metrics['consultas'] += 1
+            if not ok:
+                metrics['consultas_fallidas'] += 1
+            metrics['ultima_consulta'] = datetime.now().isoformat()
+            for name, value in notifier.counters.items():
+                metrics['contadores'][name] += value
+            for name, seconds in notifier.timings.items():
+                metrics['segundos_por_paso'][name] = metrics['segundos_por_paso'].get(name, 0) + seconds
+            latency = metrics['envio_latencia']
+            latency['total'] += sum(notifier.send_latencies)
+            latency['cantidad'] += len(notifier.send_latencies)
+            latency['maxima'] = max([latency['maxima']] + notifier.send_latencies)
+
+    def to_json(self):
+        with self.lock:
+            return json.dumps({'inicio': datetime.fromtimestamp(self.started).isoformat(),
+                               'cuentas': self.accounts}, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Texto en el formato de exposición de Prometheus"""
+        lines = []
+        with self.lock:
+            for account, metrics in self.accounts.items():
+                label = f'account="{account}"'
+                lines.append(f'seneca_runs_total{{{label}}} {metrics["consultas"]}')
+                lines.append(f'seneca_runs_failed_total{{{label}}} {metrics["consultas_fallidas"]}')
+                for name, value in metrics['contadores'].items():
+                    if name in FINGERPRINT_COUNTERS:
+                        result = 'hit' if name == 'tabla_sin_cambios' else 'miss'
+                        lines.append(f'seneca_table_fingerprint_total{{{label},result="{result}"}} {value}')
+                    else:
+                        lines.append(f'seneca_news_total{{{label},kind="{name}"}} {value}')
+                for name, seconds in metrics['segundos_por_paso'].items():
+                    lines.append(f'seneca_phase_seconds_total{{{label},phase="{name}"}} {seconds:.3f}')
+                latency = metrics['envio_latencia']
+                lines.append(f'seneca_send_seconds_sum{{{label}}} {latency["total"]:.3f}')
+                lines.append(f'seneca_send_seconds_count{{{label}}} {latency["cantidad"]}')
+                lines.append(f'seneca_send_seconds_max{{{label}}} {latency["maxima"]:.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, metrics_file, fsync=False):
+        """Reescribe el fichero de métricas (primero a un temporal para no dejarlo a medias)"""
+        write_file_atomic(metrics_file, self.to_json(), fsync)
+
+    def serve(self, port):
+        """Sirve las métricas por HTTP en localhost desde un hilo en segundo plano"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = registry.to_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = registry.to_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                log.debug(f"Métricas: {format % args}")
+
+        server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=server.serve_forever, name='metricas', daemon=True).start()
+        log.info(f"Métricas disponibles en http://127.0.0.1:{port}/metrics")
+        return server
+
+
+class RefreshRequests:
+    """Peticiones de /refresh: todas las que llegan antes o durante una consulta se atienden con ella,
+    y entre dos consultas pasan al menos min_interval segundos"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.waiting = []
+        self.current = None
+        self.last_poll = None
+
+    def request(self, bot, chat_id, thread_id=None):
+        """Apunta una petición. Devuelve los segundos que faltan para la consulta (0 si ya está en curso)"""
+        with self.lock:
+            if self.current is not None:
+                self.current.append((bot, chat_id, thread_id))
+                return 0
+            self.waiting.append((bot, chat_id, thread_id))
+            self.event.set()
+            if self.last_poll is None:
+                return 0
+            return max(0, self.last_poll + self.min_interval - time.monotonic())
+
+    def wait(self, delay):
+        """Espera a la siguiente consulta programada o a la primera permitida tras un /refresh"""
+        deadline = time.monotonic() + delay
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.event.wait(remaining):
+                return
+            earliest = (self.last_poll or 0) + self.min_interval
+            if time.monotonic() >= earliest:
+                return
+            deadline = min(deadline, earliest)
+            self.event.clear()
+
+    def poll_started(self):
+        """Marca el inicio de una consulta: las peticiones pendientes quedan atendidas con ella.
+        
+        Devuelve True si la consulta se hace porque alguien la ha pedido con /refresh.
+        """
+        with self.lock:
+            self.last_poll = time.monotonic()
+            self.current, self.waiting = self.waiting, []
+            self.event.clear()
+            return bool(self.current)
+
+    def poll_finished(self):
+        """Marca el fin de la consulta. Devuelve las peticiones a las que hay que responder"""
+        with self.lock:
+            finished, self.current = self.current or [], None
+        # Una sola respuesta por chat aunque haya pedido varias veces
+        return list(dict.fromkeys(finished))
+
+
+class TelegramBot:
+    """Comandos del bot en modo demonio, leídos con getUpdates (long polling).
+    
+    /pending y /last se responden con la bandeja de salida y el registro local, sin entrar en Séneca.
+    Solo se atienden los chats a los que ya se envían notificaciones.
+    """
+
+    POLL_TIMEOUT = 30
+    HELP = ("Comandos disponibles:\n"
+            "/pending - mensajes pendientes de envío\n"
+            "/last N - últimas N noticias notificadas (5 por defecto)\n"
+            "/refresh - consultar Séneca ahora")
+
+    def __init__(self, notifiers, refresh):
+        self.notifiers = notifiers
+        self.refresh = refresh
+        self.telegram = notifiers[0].telegram
+        self.offset = None
+        self.started = time.time()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.poll_updates, name='bot', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def poll_updates(self):
+        session = import_requests().Session()
+        url = f"{self.telegram.api_url}/bot{self.telegram.token}/getUpdates"
+        failures = 0
+        while not self.stopped.is_set():
+            params = {'timeout': self.POLL_TIMEOUT, 'allowed_updates': '["message"]'}
+            if self.offset is not None:
+                params['offset'] = self.offset
+            try:
+                response = session.get(url, params=params, timeout=self.POLL_TIMEOUT + 10)
+                response.raise_for_status()
+                updates = response.json().get('result', [])
+                failures = 0
+            except (requests.RequestException, ValueError) as e:
+                failures += 1
+                log.warning(f"Error leyendo comandos de Telegram: {e}")
+                self.stopped.wait(min(5 * failures, 300))
+                continue
+            
+            for update in updates:
+                self.offset = update['update_id'] + 1
+                if self.stopped.is_set():
+                    break
+                try:
+                    self.handle_update(update)
+                except Exception as e:
+                    log.exception(f"Error atendiendo un comando de Telegram: {e}")
+        session.close()
+
+    def chat_notifiers(self, chat_id):
+        """Cuentas que notifican a un chat (las únicas cuyos datos se le pueden mostrar)"""
+        return [notifier for notifier in self.notifiers
+                if any(str(target['chat_id']) == str(chat_id) for target in notifier.targets)]
+
+    def handle_update(self, update):
+        message = update.get('message') or {}
+        text = (message.get('text') or '').strip()
+        # Los comandos enviados mientras el demonio estaba parado ya no se atienden
+        if not text.startswith('/') or message.get('date', 0) < self.started - 60:
+            return
+        chat_id = message['chat']['id']
+        thread_id = message.get('message_thread_id')
+        notifiers = self.chat_notifiers(chat_id)
+        if not notifiers:
+            log.debug(f"Comando de un chat no configurado ({chat_id}), se ignora")
+            return
+        
+        command, *args = text.split()
+        command = command.split('@')[0].lower()
+        log.info(f"Comando {command} desde el chat {chat_id}")
+        if command == '/pending':
+            reply = self.pending_reply(notifiers, chat_id)
+        elif command == '/last':
+            limit = int(args[0]) if args and args[0].isdigit() else 5
+            reply = self.last_reply(notifiers, chat_id, max(1, min(limit, 20)))
+        elif command == '/refresh':
+            wait = self.refresh.request(self, chat_id, thread_id)
+            reply = ("Consultando Séneca..." if wait < 1 else
+                     f"Se consultará Séneca en {wait:.0f}s (hay un mínimo entre consultas)")
+        else:
+            reply = self.HELP
+        self.reply(chat_id, reply, thread_id)
+
+    def pending_reply(self, notifiers, chat_id):
+        lines = []
+        for notifier in notifiers:
+            pending = [message for _, message in notifier.outbox.pending()
+                       if str(message['chat_id']) == str(chat_id)]
+            name = f"{notifier.account}: " if notifier.account else ""
+            news = sum(len(message['news']) for message in pending)
+            lines.append(f"{name}{len(pending)} mensajes pendientes de envío ({news} noticias)")
+        return "\n".join(lines)
+
+    def last_reply(self, notifiers, chat_id, limit):
+        latest = []
+        for notifier in notifiers:
+            # Solo las noticias que las reglas de envío mandan a este chat
+            targets = [target for target in notifier.targets if str(target['chat_id']) == str(chat_id)]
+            latest += notifier.processed_news.latest(
+                limit, lambda news: any(notifier.target_matches(target, news) for target in targets))
+        latest = sorted(latest, key=lambda item: item[1]['processed_at'], reverse=True)[:limit]
+        if not latest:
+            return "Todavía no se ha notificado ninguna noticia"
+        lines = [f"<b>Últimas {len(latest)} noticias</b>"]
+        for _, news in latest:
+            processed_at = datetime.fromisoformat(news['processed_at']).strftime('%d/%m %H:%M')
+            lines.append(f"{processed_at} - {escape(news['title'])}")
+        return "\n".join(lines)
+
+    def refresh_done(self, chat_id, thread_id=None):
+        """Responde a un /refresh con el resultado de la consulta"""
+        notifiers = self.chat_notifiers(chat_id)
+        new_news = sum(notifier.counters['nuevas'] for notifier in notifiers)
+        self.reply(chat_id, f"Consulta terminada: {new_news} noticias nuevas", thread_id)
+
+    def reply(self, chat_id, text, thread_id=None):
+        if not self.telegram.send(chat_id, text, thread_id):
+            log.warning(f"No se pudo responder al chat {chat_id}")
+
+
+def start_bots(notifiers, refresh, bots=()):
+    """Un bot por token (varias cuentas pueden compartirlo). Al recargar la configuración los bots
+    en marcha siguen con las cuentas nuevas: dos lecturas de getUpdates a la vez darían conflicto"""
+    running = {bot.telegram.token: bot for bot in bots}
+    by_token = {}
+    for notifier in notifiers:
+        by_token.setdefault(notifier.telegram.token, []).append(notifier)
+    
+    started = []
+    for token, group in by_token.items():
+        bot = running.pop(token, None)
+        if bot:
+            bot.notifiers, bot.telegram = group, group[0].telegram
+        else:
+            bot = TelegramBot(group, refresh)
+            bot.start()
+        started.append(bot)
+    for bot in running.values():
+        bot.stop()
+    return started
+
+
+def account_config(config, name):
+    """Configuración de una cuenta: la general con las secciones de la cuenta encima"""
+    account = next((a for a in config.get('accounts', []) if a.get('name') == name), None)
+    if account is None:
+        raise ValueError(f"Cuenta desconocida: {name}")
+    
+    merged = {key: value for key, value in config.items() if key != 'accounts'}
+    for key, value in account.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = dict(merged[key], **value)
+        else:
+            merged[key] = value
+    
+    # Cada cuenta necesita su propio registro de noticias procesadas y su bandeja de salida
+    for key in ('data_file', 'outbox_file', 'store_file', 'state_file', 'body_cache_dir', 'lock_file'):
+        if key in config and key not in account:
+            base, ext = os.path.splitext(config[key])
+            merged[key] = f"{base}_{name}{ext}"
+    return merged
+
+
+def create_notifiers(config_file, date_filter=None, engine=None):
+    """Crea un notificador por cuenta (o uno solo si no hay sección "accounts")"""
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    
+    names = [account['name'] for account in config.get('accounts', [])] or [None]
+    notifiers = [SenecaNotifier(config_file, date_filter, engine, name) for name in names]
+    
+    # Reserva de navegadores compartida por todas las cuentas del proceso
+    driver_pool = DriverPool(config.get('max_browsers', 2),
+                             config.get('browser_max_uses', 50),
+                             config.get('browser_max_memory_mb', 0))
+    for notifier in notifiers:
+        notifier.driver_pool = driver_pool
+    return notifiers
+
+
+def run_notifiers(notifiers, max_workers=4):
+    """Ejecuta todas las cuentas con un número limitado de hilos. Devuelve los resultados por cuenta"""
+    if len(notifiers) == 1:
+        return [notifiers[0].run()]
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(notifiers)),
+                            thread_name_prefix='cuenta') as pool:
+        return list(pool.map(lambda notifier: notifier.run(), notifiers))
+
+
+def run_daemon(config_file, date_filter=None, engine=None):
+    """Consulta Séneca periódicamente sin salir, recargando la configuración si cambia"""
+    def stop(signum, frame):
+        raise SystemExit(0)
+    
+    signal.signal(signal.SIGTERM, stop)
+    
+    notifiers = []
+    max_workers = 4
+    config_mtime = None
+    # Cada cuenta tiene su propio calendario: momento de la próxima consulta y fallos seguidos
+    next_poll = {}
+    failures = {}
+    metrics = MetricsRegistry()
+    metrics_server = None
+    refresh = RefreshRequests(DEFAULT_DAEMON['refresh_min_interval'])
+    bots = []
+    
+    try:
+        while True:
+            try:
+                mtime = os.path.getmtime(config_file)
+            except OSError as e:
+                # Un editor puede estar sustituyendo el fichero: se sigue con la configuración cargada
+                if not notifiers:
+                    raise
+                log.warning(f"No se pudo leer {config_file}, se mantiene la configuración anterior: {e}")
+                mtime = config_mtime
+            
+            new_notifiers = None
+            if mtime != config_mtime:
+                if notifiers:
+                    log.info("Configuración modificada, recargando...")
+                # La configuración nueva se carga antes de cerrar las cuentas en marcha: si tiene
+                # un error (o está a medio guardar) se siguen usando las anteriores
+                try:
+                    new_notifiers = create_notifiers(config_file, date_filter, engine)
+                except Exception as e:
+                    if not notifiers:
+                        raise
+                    log.warning(f"Configuración no válida, se mantiene la anterior: {e}")
+                config_mtime = mtime
+            
+            if new_notifiers:
+                for notifier in notifiers:
+                    notifier.close()
+                if notifiers:
+                    notifiers[0].driver_pool.close()
+                notifiers = new_notifiers
+                for notifier in notifiers:
+                    notifier.keep_engines = notifier.daemon['keep_browser']
+                    notifier.keep_lock = True
+                max_workers = notifiers[0].config.get('max_workers', 4)
+                next_poll = {notifier: 0 for notifier in notifiers}
+                failures = {notifier: 0 for notifier in notifiers}
+                
+                metrics_port = notifiers[0].daemon['metrics_port']
+                if metrics_server and metrics_server.server_port != metrics_port:
+                    metrics_server.shutdown()
+                    metrics_server.server_close()
+                    metrics_server = None
+                if metrics_port and not metrics_server:
+                    metrics_server = metrics.serve(metrics_port)
+                
+                refresh.min_interval = notifiers[0].daemon['refresh_min_interval']
+                bots = start_bots(notifiers if notifiers[0].daemon['bot_commands'] else [], refresh, bots)
+            
+            # Se consultan las cuentas a las que les toca (todas si se ha pedido /refresh)
+            refreshing = refresh.poll_started()
+            due = [notifier for notifier in notifiers
+                   if refreshing or next_poll[notifier] <= time.monotonic()]
+            results = run_notifiers(due, max_workers) if due else []
+            
+            for bot, chat_id, thread_id in refresh.poll_finished():
+                bot.refresh_done(chat_id, thread_id)
+            
+            for notifier, ok in zip(due, results):
+                failures[notifier] = 0 if ok else failures[notifier] + 1
+                delay = notifier.next_poll_delay(failures[notifier])
+                next_poll[notifier] = time.monotonic() + delay
+                if notifier.account:
+                    log.info(f"Próxima consulta de '{notifier.account}' en {delay:.0f}s")
+                metrics.record(notifier, ok)
+            if notifiers[0].daemon['metrics_file']:
+                try:
+                    metrics.write(notifiers[0].daemon['metrics_file'], notifiers[0].fsync == 'always')
+                except OSError as e:
+                    log.warning(f"No se pudo guardar el fichero de métricas: {e}")
+            
+            if not notifiers[0].daemon['keep_browser']:
+                notifiers[0].driver_pool.close()
+            
+            delay = max(min(next_poll.values()) - time.monotonic(), 0)
+            log.info(f"Próxima consulta en {delay:.0f}s")
+            refresh.wait(delay)
+    
+    except KeyboardInterrupt:
+        log.info("Demonio detenido")
+    
+    finally:
+        for bot in bots:
+            bot.stop()
+        if metrics_server:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        for notifier in notifiers:
+            notifier.close()
+        if notifiers:
+            notifiers[0].driver_pool.close()
 
 
 if __name__ == "__main__":
@@ -625,8 +3133,40 @@ if __name__ == "__main__":
                        help='Configuration file path (default: config.json)')
     parser.add_argument('-d', '--date', 
                        help='Only notify news newer than this date (format: YYYYMMDD)')
+    parser.add_argument('-e', '--engine', choices=ENGINES,
+                       help='Scraping engine: selenium, http or auto (default: config "engine" or selenium)')
+    parser.add_argument('--daemon', action='store_true',
+                       help='Keep running and poll periodically (see "daemon" in config.json)')
+    parser.add_argument('--flush-outbox', action='store_true',
+                       help='Only deliver pending Telegram messages, without accessing Séneca')
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], type=str.upper,
+                       help='Logging level (default: config "log_level" or INFO)')
     
     args = parser.parse_args()
     
-    notifier = SenecaNotifier(args.config, args.date)
-    notifier.run()
\ No newline at end of file
+    try:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            log_config = json.load(f)
+    except (OSError, ValueError):
+        log_config = {}
+    setup_logging(args.log_level or log_config.get('log_level', 'INFO'),
+                  log_config.get('log_format', 'text'))
+    
+    if args.flush_outbox:
+        notifiers = create_notifiers(args.config, args.date, args.engine)
+        for notifier in notifiers:
+            if notifier.acquire_run_lock():
+                notifier.flush_outbox()
+            else:
+                log.warning(f"Otra ejecución está usando la cuenta ({notifier.run_lock.path}); no se envía su bandeja")
+            notifier.close()
+    elif args.daemon:
+        run_daemon(args.config, args.date, args.engine)
+    else:
+        notifiers = create_notifiers(args.config, args.date, args.engine)
+        try:
+            run_notifiers(notifiers, notifiers[0].config.get('max_workers', 4))
+        finally:
+            for notifier in notifiers:
+                notifier.close()
+            notifiers[0].driver_pool.close()
\ No newline at end of file
@@ -45,4 +45,7 @@ echo "   python seneca_notifier.py"
 echo ""
 echo "4. Para automatizar, agrega a crontab (ejecutar cada 30 minutos):"
 echo "   */30 * * * * cd $(pwd) && source venv/bin/activate && python seneca_notifier.py >> logs.txt 2>&1"
+echo ""
+echo "   O bien, dejarlo en marcha como demonio (sin arrancar Python y Chrome en cada consulta):"
+echo "   cd $(pwd) && source venv/bin/activate && nohup python seneca_notifier.py --daemon >> logs.txt 2>&1 &"
 echo ""
\ No newline at end of file
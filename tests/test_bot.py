@@ -0,0 +1,109 @@
+"""Comandos del bot (/pending, /last, /refresh) contra el Séneca y el Telegram locales de benchmark.py"""
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import FakeSenecaHandler, FakeTelegramHandler, make_notifier, start_server
+from seneca_notifier import RefreshRequests, TelegramBot, TelegramSender
+
+
+def wait_for(condition, timeout=10):
+    """Espera hasta que se cumpla una condición o pase el tiempo. Devuelve si se cumplió"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+class TelegramBotTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.seneca, cls.seneca_url = start_server(FakeSenecaHandler, rows=20)
+        cls.intervals = (TelegramSender.GLOBAL_INTERVAL, TelegramSender.CHAT_INTERVAL, TelegramSender.GROUP_INTERVAL)
+        TelegramSender.GLOBAL_INTERVAL = TelegramSender.CHAT_INTERVAL = TelegramSender.GROUP_INTERVAL = 0
+
+    @classmethod
+    def tearDownClass(cls):
+        TelegramSender.GLOBAL_INTERVAL, TelegramSender.CHAT_INTERVAL, TelegramSender.GROUP_INTERVAL = cls.intervals
+        cls.seneca.shutdown()
+        cls.seneca.server_close()
+
+    def setUp(self):
+        self.sent, self.updates = [], []
+        self.telegram, telegram_url = start_server(FakeTelegramHandler, sent=self.sent, updates=self.updates)
+        self.workdir = tempfile.TemporaryDirectory()
+        # El chat 1 recibe todo; el 2 solo los mensajes del "Profesor 3"
+        self.notifier = make_notifier(
+            self.workdir.name, engine='http',
+            seneca={'url': f'{self.seneca_url}/seneca/', 'username': 'usuario', 'password': 'clave'},
+            telegram={'bot_token': 'TOKEN', 'chat_id': '1', 'api_url': telegram_url,
+                      'routes': [{'chat_id': '2', 'sender': 'Profesor 3'}]})
+        self.notifier.run()
+        del self.sent[:]
+        self.refresh = RefreshRequests(0)
+        self.bot = TelegramBot([self.notifier], self.refresh)
+        self.bot.start()
+
+    def tearDown(self):
+        self.bot.stop()
+        self.notifier.close()
+        self.telegram.shutdown()
+        self.telegram.server_close()
+        self.workdir.cleanup()
+
+    def deliver(self, chat_id, text):
+        self.updates.append({'update_id': len(self.updates) + 1, 'message': {
+            'chat': {'id': chat_id}, 'text': text, 'date': int(time.time())}})
+
+    def command(self, chat_id, text):
+        """Entrega un comando al bot y espera a que conteste. Devuelve las respuestas a ese chat"""
+        answered = len(self.sent)
+        self.deliver(chat_id, text)
+        wait_for(lambda: len(self.sent) > answered)
+        return [text for chat, text in self.sent[answered:] if chat == chat_id]
+
+    def test_pending_counts_outbox(self):
+        self.notifier.outbox.add('pendiente', '1', 'Mensaje pendiente', ['pendiente'])
+        self.assertIn('1 mensajes pendientes de envío (1 noticias)', self.command('1', '/pending'))
+
+    def test_last_lists_news_of_each_chat(self):
+        last1, = self.command('1', '/last 3')
+        self.assertTrue(last1.startswith('<b>Últimas'))
+        self.assertEqual(last1.count('Asunto del mensaje'), 3)
+        last2, = self.command('2', '/last 3')
+        self.assertEqual(last2.count('Asunto del mensaje'), 1)
+        self.assertIn('Asunto del mensaje 3', last2)
+
+    def test_unknown_chat_gets_no_reply(self):
+        # Los comandos se atienden por orden: cuando contesta al chat 1, el 3 ya se ha descartado
+        self.deliver('3', '/last')
+        self.command('1', '/pending')
+        self.assertNotIn('3', [chat for chat, _ in self.sent])
+
+    def test_refresh_polls_and_reports(self):
+        # Guardado en disco: la consulta relee la bandeja al tomar el cerrojo
+        self.notifier.outbox.add('pendiente', '1', 'Mensaje pendiente', ['pendiente'])
+        self.notifier.outbox.save()
+        self.command('1', '/refresh')
+        self.assertTrue(wait_for(self.refresh.event.is_set))
+        # Lo que hace el demonio al recibir /refresh: consultar y avisar al terminar
+        self.refresh.poll_started()
+        self.notifier.run()
+        for requester, chat_id, thread_id in self.refresh.poll_finished():
+            requester.refresh_done(chat_id, thread_id)
+        wait_for(lambda: any(text.startswith('Consulta terminada') for _, text in self.sent))
+        chat1 = [text for chat, text in self.sent if chat == '1']
+        self.assertIn('Consultando Séneca...', chat1)
+        self.assertIn('Consulta terminada: 0 noticias nuevas', chat1)
+        self.assertIn('Mensaje pendiente', chat1)
+
+
+if __name__ == '__main__':
+    unittest.main()
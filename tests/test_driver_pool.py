@@ -0,0 +1,82 @@
+"""Reserva de navegadores con navegadores muertos o colgados (sin Chrome: drivers simulados)"""
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seneca_notifier import DriverPool, import_selenium
+
+
+class FakeDriver:
+    """Responde a lo que usa la reserva; con delay tarda en contestar y con dead falla como un Chrome muerto"""
+
+    def __init__(self, delay=0, dead=False):
+        self.delay = delay
+        self.dead = dead
+        self.quit_called = False
+
+    def execute_script(self, script):
+        time.sleep(self.delay)
+        if self.dead:
+            # Lo que lanza Selenium cuando ChromeDriver ya no existe
+            from urllib3.exceptions import MaxRetryError
+            raise MaxRetryError(None, '/session')
+        return 1
+
+    def delete_all_cookies(self):
+        self.execute_script('')
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+        time.sleep(self.delay)
+
+
+class DriverPoolTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        import_selenium()
+
+    def test_dead_driver_frees_its_slot(self):
+        pool = DriverPool(size=1)
+        driver = pool.acquire(lambda: FakeDriver(dead=True))
+        pool.release(driver)
+        self.assertEqual(pool.created, 0)
+        self.assertTrue(driver.quit_called)
+
+        pool.idle.append(FakeDriver(dead=True))
+        pool.created = 1
+        self.assertIsInstance(pool.acquire(FakeDriver), FakeDriver)
+        self.assertEqual(pool.created, 1)
+
+    def test_hung_driver_does_not_block_other_accounts(self):
+        pool = DriverPool(size=2)
+        hung = FakeDriver(delay=2)
+        pool.idle.append(hung)
+        pool.created = 1
+        # Una cuenta comprueba el navegador colgado mientras otra pide uno
+        checking = threading.Thread(target=pool.acquire, args=(FakeDriver,))
+        checking.start()
+        time.sleep(0.2)
+        start = time.monotonic()
+        driver = pool.acquire(FakeDriver)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertIsNot(driver, hung)
+        checking.join()
+
+    def test_acquire_gives_up_when_no_slot_frees(self):
+        pool = DriverPool(size=1)
+        pool.ACQUIRE_TIMEOUT = 0.2
+        pool.acquire(FakeDriver)
+        with self.assertRaises(RuntimeError):
+            pool.acquire(FakeDriver)
+
+
+if __name__ == '__main__':
+    unittest.main()
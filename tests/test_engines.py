@@ -0,0 +1,74 @@
+"""Noticias extraídas por los motores del buzón sintético de benchmark.py"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import FakeSenecaHandler, make_notifier, start_server
+from seneca_notifier import HttpEngine, SeleniumEngine
+
+
+# Buzón de 3 mensajes: lo que debe salir de la tabla, sin la hora de extracción.
+# Los identificadores no pueden cambiar: un cambio reenviaría todos los mensajes ya notificados.
+EXPECTED_NEWS = [
+    {'hash': 'a262d5e79f129285321b15883d3ec6f3', 'legacy_hash': 'cb2cb5fe4b361e330b8a5cf142ae63a2',
+     'title': 'Asunto del mensaje 0',
+     'content': '📅 Fecha: 01/03/2024\n👤 Remitido por: Profesor 0\n👀 Leído: 01/04/2024',
+     'date_info': '01/03/2024', 'sender': 'Profesor 0', 'link': '/seneca/nav/mensaje?id=0'},
+    {'hash': '729073be185b8a928a36eba59c88448d', 'legacy_hash': '99045d458d3402259f2dea3615bccf66',
+     'title': 'Asunto del mensaje 1',
+     'content': '📅 Fecha: 02/03/2024\n👤 Remitido por: Profesor 1\n📢 Mensaje nuevo',
+     'date_info': '02/03/2024', 'sender': 'Profesor 1', 'link': '/seneca/nav/mensaje?id=1'},
+    {'hash': 'ba43f6754a974851d378e1ac80195cbc', 'legacy_hash': '0c7460e339e1759a7b8a69d96e138231',
+     'title': 'Asunto del mensaje 2',
+     'content': '📅 Fecha: 03/03/2024\n👤 Remitido por: Profesor 2\n📢 Mensaje nuevo',
+     'date_info': '03/03/2024', 'sender': 'Profesor 2', 'link': '/seneca/nav/mensaje?id=2'},
+]
+
+
+def chrome_available():
+    return any(shutil.which(name) for name in ('google-chrome', 'chromium', 'chromium-browser', 'chrome'))
+
+
+class EngineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.url = start_server(FakeSenecaHandler, rows=len(EXPECTED_NEWS))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def scrape(self, engine_class):
+        """Noticias nuevas de una consulta con un motor, con los enlaces relativos al servidor"""
+        with tempfile.TemporaryDirectory() as workdir:
+            notifier = make_notifier(workdir, engine=engine_class.name, skip_unchanged=False,
+                                     seneca={'url': f'{self.url}/seneca/', 'username': 'usuario',
+                                             'password': 'clave'})
+            try:
+                news = notifier.scrape_news(engine_class)
+            finally:
+                notifier.close()
+                if notifier.driver_pool:
+                    notifier.driver_pool.close()
+        self.assertIsNotNone(news, f"El motor '{engine_class.name}' no completó la consulta")
+        for item in news:
+            item.pop('timestamp')
+            item['link'] = item['link'].replace(self.url, '')
+        return news
+
+    def test_http_engine_news(self):
+        self.assertEqual(self.scrape(HttpEngine), EXPECTED_NEWS)
+
+    @unittest.skipUnless(chrome_available(), 'Chrome no está instalado')
+    def test_selenium_engine_matches_http(self):
+        self.assertEqual(self.scrape(SeleniumEngine), self.scrape(HttpEngine))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Cerrojo por cuenta entre ejecuciones que se solapan"""
+import json
+import os
+import socket
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import FakeSenecaHandler, FakeTelegramHandler, make_notifier, start_server
+from seneca_notifier import RunLock, TelegramSender, boot_id, process_start_time
+
+
+class RunLockTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.seneca, cls.seneca_url = start_server(FakeSenecaHandler, rows=3)
+        cls.intervals = (TelegramSender.GLOBAL_INTERVAL, TelegramSender.CHAT_INTERVAL, TelegramSender.GROUP_INTERVAL)
+        TelegramSender.GLOBAL_INTERVAL = TelegramSender.CHAT_INTERVAL = TelegramSender.GROUP_INTERVAL = 0
+
+    @classmethod
+    def tearDownClass(cls):
+        TelegramSender.GLOBAL_INTERVAL, TelegramSender.CHAT_INTERVAL, TelegramSender.GROUP_INTERVAL = cls.intervals
+        cls.seneca.shutdown()
+        cls.seneca.server_close()
+
+    def setUp(self):
+        self.sent = []
+        self.telegram, telegram_url = start_server(FakeTelegramHandler, sent=self.sent)
+        self.workdir = tempfile.TemporaryDirectory()
+        self.config = {
+            'engine': 'http',
+            'seneca': {'url': f'{self.seneca_url}/seneca/', 'username': 'usuario', 'password': 'clave'},
+            'telegram': {'bot_token': 'TOKEN', 'chat_id': '1', 'api_url': telegram_url},
+        }
+
+    def tearDown(self):
+        self.telegram.shutdown()
+        self.telegram.server_close()
+        self.workdir.cleanup()
+
+    def notifier(self):
+        return make_notifier(self.workdir.name, **self.config)
+
+    def test_overlapping_run_uses_files_written_by_the_other(self):
+        # Dos ejecuciones de cron crean sus notificadores a la vez; B consulta cuando A ha terminado
+        first, second = self.notifier(), self.notifier()
+        self.assertTrue(first.run())
+        first.close()
+        self.assertTrue(second.run())
+        second.close()
+        self.assertEqual(len(self.sent), 3)
+        self.assertEqual(second.counters['nuevas'], 0)
+
+    def test_run_skipped_while_another_process_holds_the_lock(self):
+        notifier = self.notifier()
+        with open(notifier.run_lock.path, 'w', encoding='utf-8') as f:
+            json.dump({'pid': os.getppid(), 'host': socket.gethostname()}, f)
+        self.assertFalse(notifier.run())
+        notifier.close()
+        self.assertEqual(self.sent, [])
+        self.assertTrue(os.path.exists(notifier.run_lock.path))
+
+
+@unittest.skipUnless(boot_id(), 'Requiere /proc (Linux)')
+class StaleLockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.lock = RunLock(os.path.join(self.workdir.name, 'cuenta.lock'))
+        # Un proceso vivo que no es este: el padre
+        self.pid = os.getppid()
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def write_owner(self, **owner):
+        owner = dict({'pid': self.pid, 'host': socket.gethostname(), 'boot_id': boot_id(),
+                      'process_start': process_start_time(self.pid)}, **owner)
+        with open(self.lock.path, 'w', encoding='utf-8') as f:
+            json.dump(owner, f)
+
+    def test_lock_of_a_running_process_is_kept(self):
+        self.write_owner()
+        self.assertFalse(self.lock.acquire())
+
+    def test_lock_from_a_previous_boot_is_stale(self):
+        # Tras un corte de luz el PID del cerrojo puede ser ahora de otro proceso vivo
+        self.write_owner(boot_id='arranque-anterior')
+        self.assertTrue(self.lock.acquire())
+        self.lock.release()
+
+    def test_lock_of_a_reused_pid_is_stale(self):
+        self.write_owner(process_start=process_start_time(self.pid) + 1)
+        self.assertTrue(self.lock.acquire())
+        self.lock.release()
+
+    def test_lock_of_a_dead_process_is_stale(self):
+        self.write_owner(pid=2 ** 22 + 1)
+        self.assertTrue(self.lock.acquire())
+        self.lock.release()
+
+
+if __name__ == '__main__':
+    unittest.main()
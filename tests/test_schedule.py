@@ -0,0 +1,66 @@
+"""Consultas adaptativas y horas de silencio del modo demonio"""
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import make_notifier
+from seneca_notifier import PollSchedule, parse_quiet_hours, quiet_hours_end
+
+
+class FakeStore:
+    def __init__(self, processed_at):
+        self.news = [(str(i), {'title': '', 'processed_at': moment.isoformat()})
+                     for i, moment in enumerate(processed_at)]
+
+    def items(self):
+        return self.news
+
+
+class QuietHoursTest(unittest.TestCase):
+
+    def test_window_across_midnight(self):
+        quiet_hours = parse_quiet_hours(['22:00', '07:00'])
+        self.assertEqual(quiet_hours_end(datetime(2026, 1, 1, 23, 30), quiet_hours), datetime(2026, 1, 2, 7, 0))
+        self.assertEqual(quiet_hours_end(datetime(2026, 1, 2, 3, 0), quiet_hours), datetime(2026, 1, 2, 7, 0))
+        self.assertIsNone(quiet_hours_end(datetime(2026, 1, 2, 12, 0), quiet_hours))
+
+    def test_invalid_values_are_rejected_when_loading(self):
+        for quiet_hours in (['22:00', '7am'], '22:00-07:00', ['22:00']):
+            with self.subTest(quiet_hours=quiet_hours), tempfile.TemporaryDirectory() as workdir:
+                with self.assertRaises(ValueError):
+                    make_notifier(workdir, daemon={'quiet_hours': quiet_hours})
+
+    def test_min_interval_above_max_interval_is_rejected(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            with self.assertRaises(ValueError):
+                make_notifier(workdir, daemon={'min_interval': 9000, 'max_interval': 7200})
+
+
+class PollScheduleTest(unittest.TestCase):
+
+    def test_backfill_does_not_outweigh_weekly_pattern(self):
+        # Lunes de esta semana a las 8:00: el historial tiene que caer dentro de learning_weeks
+        today = datetime.now()
+        now = (today - timedelta(days=today.weekday())).replace(hour=8, minute=0, second=0, microsecond=0)
+        backfill = now - timedelta(days=5, hours=5)  # miércoles a las 3:00
+        processed_at = [backfill] * 300
+        for week in range(1, 5):
+            for day in range(5):
+                processed_at.append((now - timedelta(weeks=week, days=-day)).replace(hour=9, minute=10))
+        schedule = PollSchedule(FakeStore(processed_at), 600, 7200, 8)
+        schedule.learn()
+        self.assertEqual(schedule.slot_interval(now.replace(hour=9)), 600)
+        self.assertGreater(schedule.slot_interval(backfill), 600)
+        # A las 8:00 la consulta se adelanta al comienzo de la franja de las 9:00
+        self.assertEqual(schedule.next_delay(now), 3600)
+
+    def test_no_history_falls_back_to_fixed_interval(self):
+        self.assertIsNone(PollSchedule(FakeStore([]), 600, 7200, 8).next_delay(datetime(2026, 10, 19, 8, 0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Envío a Telegram contra la API local de benchmark.py: reintentos, límites de ritmo y orden de la bandeja"""
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import FakeTelegramHandler, make_notifier, start_server
+from seneca_notifier import Outbox, TelegramSender
+
+
+class TelegramSenderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.intervals = (TelegramSender.GLOBAL_INTERVAL, TelegramSender.CHAT_INTERVAL, TelegramSender.GROUP_INTERVAL)
+        TelegramSender.GLOBAL_INTERVAL = TelegramSender.CHAT_INTERVAL = TelegramSender.GROUP_INTERVAL = 0
+        self.sent, self.replies = [], []
+        self.server, url = start_server(FakeTelegramHandler, sent=self.sent, replies=self.replies)
+        self.sender = TelegramSender({'bot_token': 'TOKEN', 'api_url': url, 'max_retries': 2})
+
+    def tearDown(self):
+        self.sender.close()
+        self.server.shutdown()
+        self.server.server_close()
+        TelegramSender.GLOBAL_INTERVAL, TelegramSender.CHAT_INTERVAL, TelegramSender.GROUP_INTERVAL = self.intervals
+
+    def attempts(self):
+        return self.server.RequestHandlerClass.messages
+
+    def test_delivered(self):
+        self.assertTrue(self.sender.send('1', 'hola'))
+        self.assertEqual(self.sent, [('1', 'hola')])
+
+    def test_waits_retry_after_on_429(self):
+        self.replies.append((429, {'ok': False, 'parameters': {'retry_after': 1}}))
+        start = time.monotonic()
+        self.assertTrue(self.sender.send('1', 'hola'))
+        self.assertGreaterEqual(time.monotonic() - start, 1)
+        self.assertEqual(self.attempts(), 2)
+
+    def test_long_retry_after_leaves_message_pending(self):
+        self.replies.append((429, {'ok': False, 'parameters': {'retry_after': 3600}}))
+        start = time.monotonic()
+        self.assertFalse(self.sender.send('1', 'hola'))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(self.attempts(), 1)
+
+    def test_retries_server_errors(self):
+        self.replies.append((502, {'ok': False}))
+        self.assertTrue(self.sender.send('1', 'hola'))
+        self.assertEqual(self.attempts(), 2)
+
+    def test_gives_up_after_max_retries(self):
+        self.replies.extend([(500, {'ok': False})] * 3)
+        self.assertFalse(self.sender.send('1', 'hola'))
+        self.assertEqual(self.attempts(), 3)
+
+    def test_does_not_retry_rejected_messages(self):
+        self.replies.append((400, {'ok': False, 'description': 'Bad Request: chat not found'}))
+        self.assertFalse(self.sender.send('1', 'hola'))
+        self.assertEqual(self.attempts(), 1)
+
+
+class OutboxDeliveryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.intervals = (TelegramSender.GLOBAL_INTERVAL, TelegramSender.CHAT_INTERVAL, TelegramSender.GROUP_INTERVAL)
+        TelegramSender.GLOBAL_INTERVAL = TelegramSender.CHAT_INTERVAL = TelegramSender.GROUP_INTERVAL = 0
+        self.sent, self.replies = [], []
+        self.server, url = start_server(FakeTelegramHandler, sent=self.sent, replies=self.replies)
+        self.workdir = tempfile.TemporaryDirectory()
+        self.notifier = make_notifier(self.workdir.name, telegram={
+            'bot_token': 'TOKEN', 'chat_id': '1', 'api_url': url, 'max_retries': 0})
+
+    def tearDown(self):
+        self.notifier.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.workdir.cleanup()
+        TelegramSender.GLOBAL_INTERVAL, TelegramSender.CHAT_INTERVAL, TelegramSender.GROUP_INTERVAL = self.intervals
+
+    def test_failed_message_keeps_later_ones_of_the_chat_pending(self):
+        outbox = self.notifier.outbox
+        outbox.add('primero', '1', 'Primero', ['a'])
+        outbox.add('segundo', '1', 'Segundo', ['b'])
+        self.replies.append((502, {'ok': False}))
+        self.assertEqual(self.notifier.deliver_outbox(), 0)
+        self.assertEqual(self.sent, [])
+        self.assertEqual(outbox.messages['primero']['attempts'], 1)
+        self.assertEqual(outbox.messages['segundo']['attempts'], 0)
+        self.assertEqual([message_id for message_id, _ in outbox.pending()], ['primero', 'segundo'])
+
+        self.assertEqual(self.notifier.deliver_outbox(), 2)
+        self.assertEqual(self.sent, [('1', 'Primero'), ('1', 'Segundo')])
+        self.assertEqual(outbox.messages['segundo']['status'], Outbox.SENT)
+
+
+if __name__ == '__main__':
+    unittest.main()